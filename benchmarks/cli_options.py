@@ -0,0 +1,54 @@
+"""
+Verifica a leitura das opções da CLI: opções compartilhadas valem tanto antes quanto depois do subcomando,
+e os padrões do subcomando não sobrescrevem o que foi informado antes dele.
+
+    poetry run python -m benchmarks.cli_options
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# (argumentos, atributos esperados no Namespace)
+CHECKS = [
+    (["rank"], {"offline": False, "headless": False, "checkpoint_dir": "checkpoints", "output": "final.csv"}),
+    (["--offline", "--headless", "rank"], {"offline": True, "headless": True}),
+    (["rank", "--offline", "--headless"], {"offline": True, "headless": True}),
+    (["--cache-max-entries", "10", "screen"], {"cache_max_entries": 10, "force_from": None}),
+    (["screen", "--force-from", "resumos"], {"force_from": "resumos", "offline": False}),
+    (["--checkpoint-dir", "outro", "plot"], {"checkpoint_dir": "outro", "stage": "fontes"}),
+    (["--output", "saida.csv", "--rank-by", "mean", "rank"], {"output": "saida.csv", "rank_by": "mean"}),
+    (["--offline", "serve", "--port", "9000"], {"offline": True, "port": 9000}),
+    (["--offline", "cluster"], {"offline": True, "output": "artigos_com_clusters.csv"}),
+    (["collect"], {"output": "artigos_google_scholar.jsonl", "headless": False}),
+]
+
+
+def check():
+    """
+    Retorna a lista de divergências (argumentos, atributo, esperado, obtido); vazia se todas as leituras conferem.
+    """
+    import main
+
+    parser = main.build_parser()
+    failures = []
+    for argv, expected in CHECKS:
+        args = vars(parser.parse_args(argv))
+        for name, value in expected.items():
+            if args.get(name) != value:
+                failures.append((argv, name, value, args.get(name)))
+    return failures
+
+
+def main():
+    failures = check()
+    for argv, name, expected, obtained in failures:
+        print(f"  {' '.join(argv)}: {name} = {obtained!r} (esperado {expected!r})")
+    if failures:
+        sys.exit(1)
+    print(f"Opções da CLI: {len(CHECKS)} leituras conferem.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import re
+import json
+import time
+import zlib
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+from scholarly import MaxTriesExceededException
+
+
+def _stable_fraction(text):
+    # Valor determinístico entre 0 e 1 para um texto (mesma resposta em todas as execuções)
+    return (zlib.crc32(text.encode("utf-8")) % 1000) / 1000
+
+
+class FakeOpenAIServer:
+    """
+    Servidor HTTP local compatível com os endpoints /v1/chat/completions e /v1/embeddings da OpenAI.
+    As respostas são determinísticas, com latência e taxa de erros (429/500) configuráveis.
+    Use `api_base` como `FunnelManager(..., api_base=server.api_base)`.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, embedding_dim=256, port=0, seed=42):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.embedding_dim = embedding_dim
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._token_vectors = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def api_base(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                status, payload = fake.respond(self.path, body)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 429:
+                    self.send_header("Retry-After", "0.01")
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def respond(self, path, body):
+        with self._lock:
+            self.requests += 1
+            failed = self._random.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            status = 429 if self._random.random() < 0.5 else 500
+            return status, {"error": {"message": "Erro simulado", "type": "server_error"}}
+        if path.endswith("/embeddings"):
+            return 200, self._embeddings(body)
+        return 200, self._chat_completion(body)
+
+    def _chat_completion(self, body):
+        prompt = body["messages"][-1]["content"]
+        if "array JSON" in prompt:
+            # Triagem em lotes: uma pontuação por id listado no prompt
+            items = re.findall(r"^\[(\d+)\] (.*)$", prompt, re.MULTILINE)
+            content = json.dumps([{"id": int(item_id), "score": _stable_fraction(text)} for item_id, text in items])
+        else:
+            # A resposta negativa não pode conter "similar", "relevante" nem "relacionado" (nem "irrelevante"),
+            # senão a triagem individual aceitaria todos os artigos
+            content = "relacionado" if _stable_fraction(prompt) >= 0.5 else "sem relação com o projeto"
+        prompt_tokens = len(prompt) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    def _embeddings(self, body):
+        inputs = body["input"]
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        data = [{"object": "embedding", "index": i, "embedding": self._embed(text).tolist()}
+                for i, text in enumerate(inputs)]
+        tokens = sum(len(text) // 4 + 1 for text in inputs)
+        return {"object": "list", "data": data, "model": body.get("model"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    def _embed(self, text):
+        # Soma de vetores aleatórios fixos por palavra: textos com palavras em comum ficam próximos
+        vector = np.zeros(self.embedding_dim, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            token_vector = self._token_vectors.get(token)
+            if token_vector is None:
+                rng = np.random.default_rng(zlib.crc32(token.encode("utf-8")))
+                token_vector = self._token_vectors[token] = rng.standard_normal(self.embedding_dim).astype(np.float32)
+            vector += token_vector
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+class FakeScholarly:
+    """
+    Substituto do módulo scholarly para o SearchManager (`sessions=[FakeScholarly(...)]`).
+    `search_pubs` devolve os artigos do corpus que contêm algum termo da query, a partir de `start_index`,
+    com latência e falhas (MaxTriesExceededException) configuráveis.
+    """
+
+    def __init__(self, articles, latency=0.0, error_rate=0.0, seed=42):
+        self.articles = articles
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    def search_pubs(self, query, start_index=0):
+        terms = {term.lower() for term in re.findall(r"[\w-]+", query) if term not in ("AND", "OR")}
+        rank = 0
+        for article in self.articles:
+            bib = article["bib"]
+            words = set(f"{bib['title']} {bib['abstract']}".lower().split())
+            if not terms & words:
+                continue
+            rank += 1
+            if rank <= start_index:
+                continue
+            if self.latency:
+                time.sleep(self.latency)
+            if self._random.random() < self.error_rate:
+                raise MaxTriesExceededException("Falha simulada do Google Scholar")
+            yield {**article, "gsrank": rank}
@@ -0,0 +1,127 @@
+"""
+Orçamento de tempo de inicialização da CLI: cada medição roda em um interpretador novo (cold start)
+e executa a preparação real do subcomando (parser, FunnelManager, caches, leitura da entrada),
+parando antes do trabalho propriamente dito (busca, chamadas à API, embeddings, gráficos).
+
+    poetry run python -m benchmarks.import_time
+    poetry run python -m benchmarks.import_time --repeat 10 --scale 2
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Módulos pesados que só podem ser carregados quando o subcomando realmente os usa
+HEAVY_MODULES = ["openai", "scholarly", "sklearn", "plotly", "wordcloud", "scipy"]
+
+_PARSE = "import main\nargs = main.build_parser().parse_args({argv!r})\n"
+
+# (nome, código executado no diretório de trabalho temporário, orçamento em segundos)
+CHECKS = [
+    ("main --help", "import sys, runpy\nsys.argv = ['main.py', '--help']\ntry:\n"
+                    "    runpy.run_path(os.path.join(ROOT, 'main.py'), run_name='__main__')\n"
+                    "except SystemExit:\n    pass", 0.3),
+    ("collect", _PARSE.format(argv=["collect"]) +
+     "from handdlers.search_manager import SearchManager\n"
+     "SearchManager(main.QUERY, num_results=args.max_articles)", 0.6),
+    ("screen", _PARSE.format(argv=["screen"]) + "main.make_funnel(args)", 0.8),
+    ("rank", _PARSE.format(argv=["rank", "--input", "final.csv"]) +
+     "funnel = main.make_funnel(args)\ndf = main.read_articles(args.input)", 0.8),
+    ("plot", _PARSE.format(argv=["plot"]) +
+     "from handdlers.visualization_manager import VisualizationManager\n"
+     "VisualizationManager(headless=args.headless, output_formats=args.chart_formats)\n"
+     "df = main.load_stage(args, args.stage)", 0.6),
+    ("cluster", _PARSE.format(argv=["cluster"]) +
+     "funnel = main.make_funnel(args)\ndf = main.load_stage(args, args.stage)", 0.8),
+    ("serve", _PARSE.format(argv=["serve"]) +
+     "from handdlers.service_manager import RankingService\n"
+     "RankingService(main.make_funnel(args), articles_file=args.input)", 0.8),
+]
+
+
+def _run(code, workdir):
+    # Mede dentro do processo filho, para não contar a criação do processo
+    script = (
+        "import os, time, sys, json\n"
+        f"ROOT = {ROOT!r}\n"
+        "sys.path.insert(0, ROOT)\n"
+        "start = time.perf_counter()\n"
+        f"exec(compile({code!r}, '<import_time>', 'exec'))\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "sys.stderr.write(json.dumps({'tempo_s': elapsed, 'carregados': loaded}))\n"
+    )
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY") or "sk-import-time"}
+    completed = subprocess.run([sys.executable, "-c", script], cwd=workdir, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr)
+    return json.loads(completed.stderr.strip().splitlines()[-1])
+
+
+def _prepare(workdir):
+    """
+    Cria a entrada de `rank` e os checkpoints lidos por `plot` e `cluster`, com um corpus sintético pequeno.
+    """
+    from benchmarks.synthetic_corpus import generate_corpus, write_corpus
+    from handdlers.search_manager import SearchManager
+    from handdlers.checkpoint_manager import CheckpointManager
+    from handdlers.stages import FUNNEL_STAGES
+
+    df = SearchManager("import-time", sessions=[object()])._load_dataframe(
+        write_corpus(generate_corpus(200), os.path.join(workdir, "corpus.jsonl"))
+    )
+    df.to_csv(os.path.join(workdir, "final.csv"), index=False)
+    checkpoints = CheckpointManager(os.path.join(workdir, "checkpoints"), stages=FUNNEL_STAGES)
+    for stage in ("fontes", "refinamento"):
+        checkpoints.run_stage(stage, lambda: df)
+
+
+def measure(repeat=5, scale=1.0):
+    """
+    Retorna uma lista com a mediana do tempo de cada verificação, o orçamento e os módulos pesados carregados.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        _prepare(workdir)
+        for name, code, budget in CHECKS:
+            results.append(_check(name, code, budget, workdir, repeat, scale))
+    return results
+
+
+def _check(name, code, budget, workdir, repeat, scale):
+    runs = [_run(code, workdir) for _ in range(repeat)]
+    elapsed = statistics.median(run["tempo_s"] for run in runs)
+    loaded = sorted({module for run in runs for module in run["carregados"]})
+    return {
+        "comando": name,
+        "tempo_s": round(elapsed, 4),
+        "orcamento_s": budget * scale,
+        "modulos_pesados": loaded,
+        "ok": elapsed <= budget * scale and not loaded,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica o tempo de importação de cada subcomando da CLI.")
+    parser.add_argument("--repeat", type=int, default=5, help="Execuções por verificação (usa a mediana).")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiplicador dos orçamentos (máquinas mais lentas ou CI).")
+    args = parser.parse_args()
+
+    results = measure(args.repeat, args.scale)
+    for result in results:
+        status = "ok" if result["ok"] else "ACIMA DO ORÇAMENTO"
+        extra = f"  carregou: {', '.join(result['modulos_pesados'])}" if result["modulos_pesados"] else ""
+        print(f"  {result['comando']:<14} {result['tempo_s']:>7.3f}s / {result['orcamento_s']:.3f}s  {status}{extra}")
+    if not all(result["ok"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Benchmarks do funil sem custo de API: corpus sintético, servidor OpenAI falso e substituto do scholarly.
+
+    poetry run python -m benchmarks.run_benchmarks --sizes 1000 10000 100000
+    poetry run python -m benchmarks.run_benchmarks --sizes 1000 --baseline benchmarks/resultados/anterior.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+from contextlib import contextmanager
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_corpus import generate_corpus, write_corpus
+from benchmarks.fake_services import FakeOpenAIServer, FakeScholarly
+from benchmarks import import_time, cli_options
+from handdlers.metrics_manager import MetricsManager
+from handdlers.search_manager import SearchManager
+from handdlers.data_processor import DataProcessor
+from handdlers.dedup_manager import DedupManager
+from handdlers.index_manager import InvertedIndex
+from handdlers.llm_manager import LLMManager
+from handdlers.embedding_manager import EmbeddingManager, EmbeddingStore, OpenAIEmbeddingBackend
+from handdlers.similarity_manager import SimilarityIndex
+from handdlers.cluster_manager import ClusterManager
+from handdlers.visualization_manager import VisualizationManager
+from handdlers.funnel_manager import FunnelManager
+
+QUERY = "(transformer OR transformers OR transformer-based) AND (attention OR self-attention OR multi-head)"
+PROJECT_TITLE = "Alterando o mecanismo de atenção na arquitetura Transformers aplicando funções de (pré-)agregação"
+DEFAULT_RESULTS_DIR = os.path.join(ROOT, "benchmarks", "resultados")
+
+
+class BenchmarkRunner:
+    """
+    Executa cada etapa do funil sobre corpora sintéticos de vários tamanhos e registra tempo e vazão.
+    As etapas que chamam a API usam o servidor falso e são limitadas a `api_limit` artigos.
+    """
+
+    def __init__(self, sizes, api_limit=2000, collect_limit=5000, latency=0.0, error_rate=0.0, workers=8):
+        self.sizes = sizes
+        self.api_limit = api_limit
+        self.collect_limit = collect_limit
+        self.latency = latency
+        self.error_rate = error_rate
+        self.workers = workers
+        self.metrics = MetricsManager()
+        self.results = []
+
+    @contextmanager
+    def measure(self, size, stage, items=0):
+        """
+        Mede o bloco como a etapa `stage`. O número de itens pode ser corrigido dentro do bloco em `result["itens"]`.
+        """
+        result = {"tamanho": size, "etapa": stage, "itens": items}
+        with self.metrics.stage(f"{size}/{stage}") as entry:
+            yield result
+        result["tempo_s"] = entry["tempo_s"]
+        result["itens_por_s"] = round(result["itens"] / entry["tempo_s"], 1) if entry["tempo_s"] else None
+        self.results.append(result)
+        print(f"  {stage:<16} {result['itens']:>8} itens  {result['tempo_s']:>9.3f}s  "
+              f"{result['itens_por_s'] or 0:>12.1f} itens/s")
+
+    def run(self):
+        with FakeOpenAIServer(latency=self.latency, error_rate=self.error_rate) as server, \
+                tempfile.TemporaryDirectory() as workdir:
+            previous_dir = os.getcwd()
+            os.chdir(workdir)
+            try:
+                for size in self.sizes:
+                    print(f"Corpus sintético com {size} artigos:")
+                    self.run_size(size, server)
+            finally:
+                os.chdir(previous_dir)
+        return self.results
+
+    def run_size(self, size, server):
+        articles = generate_corpus(size)
+        corpus_file = write_corpus(articles, f"corpus_{size}.jsonl")
+
+        # Coleta: SearchManager com sessões falsas em paralelo, sem o delay do Google Scholar
+        collect_size = min(size, self.collect_limit)
+        sessions = [FakeScholarly(articles, latency=self.latency, error_rate=self.error_rate) for _ in range(4)]
+        search_manager = SearchManager(QUERY, num_results=collect_size, delay=0, fsync_every=100,
+                                       sessions=sessions, expand_query=True)
+        with self.measure(size, "coleta") as result:
+            result["itens"] = len(search_manager.collect_articles(f"coleta_{size}.jsonl"))
+
+        # Leitura do corpus completo (JSONL -> DataFrame colunar)
+        with self.measure(size, "leitura", size):
+            df = SearchManager(QUERY)._load_dataframe(corpus_file)
+
+        data_processor = DataProcessor()
+        with self.measure(size, "normalizacao", size):
+            df = data_processor.preprocess_data(df)
+            df = data_processor.filter_by_top_sources(df)
+
+        with self.measure(size, "deduplicacao", size):
+            DedupManager().deduplicate(df)
+
+        with self.measure(size, "indice", size):
+            index = InvertedIndex()
+            index.add_documents(InvertedIndex.documents(df))
+            index.search(QUERY, k=100)
+            data_processor.keyword_scores(df, [["transformer", "transformers"], ["attention"]], index=index)
+
+        # Triagem com GPT-4o Mini (servidor falso): individual e em lotes
+        funnel = FunnelManager(QUERY, PROJECT_TITLE, "sk-benchmark", api_base=server.api_base,
+                               max_concurrency=self.workers, requests_per_minute=None, tokens_per_minute=None,
+                               response_cache_path=None, embedding_cache_dir=None, checkpoint_dir="checkpoints",
+                               batch_size=20)
+        funnel.llm_manager.backoff_base = 0.01
+        sample = df.head(self.api_limit).copy()
+        for stage, mode in (("triagem", "individual"), ("triagem_lotes", "batch")):
+            funnel.screening_mode = mode
+            with self.measure(size, stage, len(sample)) as result:
+                result["aceitos"] = len(funnel.filter_by_summary_similarity(sample.copy()))
+            # Com o servidor falso cerca de metade dos artigos é aceita; 0% ou 100% indica uma triagem quebrada
+            assert 0 < result["aceitos"] < len(sample), \
+                f"Triagem '{mode}' aceitou {result['aceitos']} de {len(sample)} artigos."
+
+        # Embeddings: primeira passada pela API falsa, segunda inteiramente do cache em disco
+        texts = InvertedIndex.documents(df.head(self.api_limit * 5))
+        embedding_manager = EmbeddingManager(
+            OpenAIEmbeddingBackend(LLMManager(max_workers=self.workers, requests_per_minute=None,
+                                              tokens_per_minute=None, api_base=server.api_base,
+                                              api_key="sk-benchmark")),
+            store=EmbeddingStore(f"embeddings_{size}")
+        )
+        with self.measure(size, "embeddings", len(texts)):
+            embedding_manager.embed(texts)
+        with self.measure(size, "embeddings_cache", len(texts)):
+            embedding_manager.embed(texts)
+
+        # Similaridade e agrupamento sobre uma matriz do tamanho do corpus
+        rng = np.random.default_rng(0)
+        matrix = rng.standard_normal((size, server.embedding_dim)).astype(np.float32)
+        with self.measure(size, "similaridade", size):
+            similarity_index = SimilarityIndex(matrix)
+            similarity_index.search(rng.standard_normal((2, server.embedding_dim)), k=100)
+        with self.measure(size, "agrupamento", size):
+            ClusterManager(n_clusters=8).cluster_dataframe(df[['Título']].copy(), matrix)
+
+        # Gráficos no modo headless (JSON, sem depender do Kaleido) e nuvens de palavras
+        visualization_manager = VisualizationManager(headless=True, output_formats=["json"])
+        with self.measure(size, "graficos", size):
+            visualization_manager.create_line_chart(df, output_file=f"linhas_{size}.png")
+            visualization_manager.generate_word_clouds(df, [('Título', f"nuvens_{size}", 'title_summary')])
+            visualization_manager.flush()
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results, baseline_file, tolerance):
+    """
+    Compara os tempos com uma execução anterior. Retorna as etapas que ficaram mais lentas que a tolerância.
+    """
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        baseline = {(r["tamanho"], r["etapa"]): r for r in json.load(f)["resultados"]}
+
+    regressions = []
+    print(f"\nComparação com {baseline_file} (tolerância de {tolerance:.0%}):")
+    for result in results:
+        previous = baseline.get((result["tamanho"], result["etapa"]))
+        if not previous or not previous["tempo_s"]:
+            continue
+        ratio = result["tempo_s"] / previous["tempo_s"]
+        status = "REGRESSÃO" if ratio > 1 + tolerance else "ok"
+        print(f"  {result['tamanho']:>7} {result['etapa']:<16} {previous['tempo_s']:>9.3f}s -> "
+              f"{result['tempo_s']:>9.3f}s  ({ratio:.2f}x)  {status}")
+        if status != "ok":
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks das etapas do funil com serviços falsos.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Tamanhos dos corpora sintéticos.")
+    parser.add_argument("--api-limit", type=int, default=2000,
+                        help="Máximo de artigos enviados ao servidor falso na triagem (embeddings: 5x).")
+    parser.add_argument("--collect-limit", type=int, default=5000, help="Máximo de artigos na coleta simulada.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latência simulada de cada requisição (s).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de requisições com erro simulado.")
+    parser.add_argument("--workers", type=int, default=8, help="Requisições simultâneas à API falsa.")
+    parser.add_argument("--output", help="Arquivo JSON de resultados (padrão: benchmarks/resultados/<data>.json).")
+    parser.add_argument("--baseline", help="Resultados anteriores para comparação.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Aumento de tempo tolerado na comparação.")
+    parser.add_argument("--import-budget-scale", type=float, default=1.0,
+                        help="Multiplicador dos orçamentos de tempo de importação da CLI.")
+    args = parser.parse_args()
+
+    # Cold start de cada subcomando, medido antes que este processo carregue os módulos pesados nos filhos
+    print("Tempo de importação da CLI:")
+    startup = import_time.measure(scale=args.import_budget_scale)
+    for result in startup:
+        print(f"  {result['comando']:<16} {result['tempo_s']:>9.3f}s  (orçamento {result['orcamento_s']:.3f}s)  "
+              f"{'ok' if result['ok'] else 'ACIMA DO ORÇAMENTO'}")
+
+    cli_failures = cli_options.check()
+    for argv, name, expected, obtained in cli_failures:
+        print(f"  Opção da CLI divergente em '{' '.join(argv)}': {name} = {obtained!r} (esperado {expected!r})")
+
+    runner = BenchmarkRunner(args.sizes, api_limit=args.api_limit, collect_limit=args.collect_limit,
+                             latency=args.latency, error_rate=args.error_rate, workers=args.workers)
+    results = runner.run()
+
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, f"{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"metadados": metadata(), "importacao": startup, "resultados": results}, f, ensure_ascii=False, indent=2)
+    print(f"Resultados salvos em {output}.")
+
+    over_budget = not all(result["ok"] for result in startup)
+    if over_budget or cli_failures or (args.baseline and compare(results, args.baseline, args.tolerance)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
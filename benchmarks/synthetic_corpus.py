@@ -0,0 +1,98 @@
+import json
+import numpy as np
+
+# Vocabulário e fontes no estilo dos resultados do Google Scholar para a query do projeto
+TOPIC_WORDS = [
+    "transformer", "transformers", "attention", "self-attention", "multi-head", "mechanism", "aggregation",
+    "vision", "language", "model", "models", "network", "networks", "neural", "deep", "learning", "graph",
+    "temporal", "spatial", "encoder", "decoder", "architecture", "efficient", "sparse", "linear", "memory",
+    "image", "video", "speech", "text", "classification", "segmentation", "detection", "forecasting",
+    "recognition", "translation", "generation", "retrieval", "representation", "embedding", "token",
+    "pre-training", "fine-tuning", "benchmark", "dataset", "robust", "scalable", "hierarchical", "hybrid",
+    "convolutional", "recurrent", "fusion", "cross-modal", "medical", "traffic", "remote", "sensing",
+    "point", "cloud", "fuzzy", "choquet", "integral", "pooling", "layer", "module", "based", "novel",
+]
+FILLER_WORDS = [
+    "a", "an", "the", "for", "with", "of", "in", "on", "and", "using", "via", "towards", "we", "propose",
+    "this", "paper", "study", "our", "approach", "method", "results", "show", "that", "is", "are",
+]
+VENUES = [
+    "arXiv preprint arXiv:2106.04554", "arXiv preprint arXiv:2010.11929", "IEEE Access", "Neurocomputing",
+    "Proceedings of the IEEE/CVF conference on computer vision and pattern recognition",
+    "Proceedings of the IEEE/CVF International Conference on Computer Vision",
+    "Advances in neural information processing systems", "International Conference on Learning Representations",
+    "Expert Systems with …", "Pattern Recognition", "Remote Sensing", "Applied Sciences", "Sensors",
+    "Electronics", "IEEE Transactions on …", "Information Sciences", "Knowledge-Based Systems",
+    "European Conference on …", "AAAI Conference on Artificial Intelligence", "Neural Networks",
+    "Medical Image Analysis", "Journal of Physics: Conference Series", "Scientific Reports", "",
+]
+AUTHORS = [
+    "A Vaswani", "N Shazeer", "N Parmar", "J Uszkoreit", "L Jones", "AN Gomez", "Ł Kaiser", "I Polosukhin",
+    "A Dosovitskiy", "L Beyer", "S Reza", "MC Ferreira", "Y Tay", "M Dehghani", "Z Liu", "H Hu", "Y Lin",
+    "G Dimuro", "H Bustince", "J Fernandez", "T Wolf", "K Han", "Y Wang", "X Chen", "J Li", "W Zhang",
+]
+
+
+def _sentence(rng, length):
+    topic = rng.choice(TOPIC_WORDS, size=length)
+    filler = rng.choice(FILLER_WORDS, size=length)
+    use_filler = rng.random(length) < 0.35
+    return " ".join(np.where(use_filler, filler, topic))
+
+
+def generate_corpus(size, seed=42, duplicate_rate=0.03):
+    """
+    Gera `size` artigos com o mesmo esquema dos resultados do scholarly (bib, gsrank, pub_url...).
+    Uma fração `duplicate_rate` são quase duplicatas (título com variação de caixa e snippet truncado)
+    de artigos anteriores, como as versões arXiv + publicada que aparecem na coleta real.
+    """
+    rng = np.random.default_rng(seed)
+    years = rng.integers(2015, 2025, size=size)
+    venue_ids = rng.zipf(1.6, size=size) % len(VENUES)
+    title_lengths = rng.integers(6, 16, size=size)
+    snippet_lengths = rng.integers(25, 45, size=size)
+    citations = rng.zipf(1.8, size=size)
+
+    articles = []
+    for i in range(size):
+        if i > 10 and rng.random() < duplicate_rate:
+            original = articles[int(rng.integers(0, len(articles)))]["bib"]
+            title = original["title"].lower() if rng.random() < 0.5 else original["title"] + ": extended version"
+            abstract = original["abstract"][:int(len(original["abstract"]) * 0.8)]
+        else:
+            title = _sentence(rng, title_lengths[i]).capitalize()
+            abstract = _sentence(rng, snippet_lengths[i])
+        article_id = f"{i:08x}"
+        articles.append({
+            "container_type": "Publication",
+            "source": "PUBLICATION_SEARCH_SNIPPET",
+            "bib": {
+                "title": title,
+                "author": list(rng.choice(AUTHORS, size=int(rng.integers(1, 6)), replace=False)),
+                "pub_year": str(years[i]),
+                "venue": VENUES[venue_ids[i]],
+                "abstract": abstract,
+            },
+            "filled": False,
+            "gsrank": i + 1,
+            "pub_url": f"https://example.org/article/{article_id}",
+            "author_id": [""],
+            "url_scholarbib": f"/scholar?q=info:{article_id}:scholar.google.com/&output=cite",
+            "num_citations": int(citations[i]),
+            "citedby_url": f"/scholar?cites={article_id}",
+            "url_related_articles": f"/scholar?q=related:{article_id}:scholar.google.com/",
+        })
+    return articles
+
+
+def write_corpus(articles, path):
+    """
+    Grava o corpus em JSONL (um artigo por linha) ou, se `path` terminar em .json, no formato antigo de lista única.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            json.dump(articles, f, ensure_ascii=False)
+        else:
+            for article in articles:
+                f.write(json.dumps(article, ensure_ascii=False) + "\n")
+    return path
@@ -0,0 +1,143 @@
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+
+class CacheMissError(LookupError):
+    """
+    Levantada no modo offline quando uma requisição não está no cache.
+    """
+
+
+class ResponseCache:
+    """
+    Cache persistente (SQLite) de respostas de chat, indexado por (modelo, mensagens, max_tokens, temperatura).
+    Suporta expiração por idade, limite de entradas (remove as menos usadas) e um modo offline
+    que falha imediatamente quando a resposta não está armazenada.
+    """
+
+    def __init__(self, path="cache_respostas.sqlite", max_entries=None, max_age_days=None, offline=False,
+                 eviction_margin=0.05, access_flush_every=256):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400 if max_age_days else None
+        self.offline = offline
+        # O cache pode passar de max_entries por esta fração antes de uma remoção em lote
+        self.eviction_margin = eviction_margin
+        # Os acessos (last_access) são gravados em lote a cada access_flush_every acertos
+        self.access_flush_every = access_flush_every
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pending_access = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._conn.commit()
+        # Estimativa do número de entradas (nunca menor que o real), recontada a cada remoção
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if max_entries and self._entries > max_entries:
+            with self._lock:
+                self._evict_least_used()
+
+    @staticmethod
+    def make_key(request):
+        payload = {
+            "model": request.get("model"),
+            "messages": request.get("messages"),
+            "max_tokens": request.get("max_tokens"),
+            "temperature": request.get("temperature"),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, request):
+        """
+        Retorna a resposta armazenada para a requisição, ou None se não existir ou estiver expirada.
+        """
+        key = self.make_key(request)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and self.max_age_seconds and now - row[1] > self.max_age_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._pending_access[key] = now
+            if len(self._pending_access) >= self.access_flush_every:
+                self._write_access()
+                self._conn.commit()
+            return row[0]
+
+    def set(self, request, response):
+        """
+        Armazena a resposta. Quando o cache passa de max_entries pela margem configurada,
+        as entradas menos usadas são removidas de uma vez, até voltar a max_entries.
+        """
+        now = time.time()
+        with self._lock:
+            self._write_access()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (self.make_key(request), response, now, now)
+            )
+            self._entries += 1
+            if self.max_entries and self._entries > self.max_entries * (1 + self.eviction_margin):
+                self._evict_least_used()
+            self._conn.commit()
+
+    def flush(self):
+        """
+        Grava os acessos ainda pendentes.
+        """
+        with self._lock:
+            if self._pending_access:
+                self._write_access()
+                self._conn.commit()
+
+    def _write_access(self):
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+
+    def _evict_least_used(self):
+        self._write_access()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        excess = self._entries - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                (excess,)
+            )
+            self._entries = self.max_entries
+        self._conn.commit()
+
+    def evict_expired(self):
+        """
+        Remove todas as entradas mais antigas que a idade máxima configurada.
+        """
+        if not self.max_age_seconds:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age_seconds,)
+            )
+            self._conn.commit()
+            self._entries -= cursor.rowcount
+            return cursor.rowcount
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
@@ -0,0 +1,111 @@
+import os
+import json
+import hashlib
+from contextlib import nullcontext
+import pandas as pd
+
+
+class CheckpointManager:
+    """
+    Persiste a saída de cada etapa nomeada do funil (Parquet) junto com uma impressão digital
+    das entradas e da configuração. Em uma nova execução, etapas com a mesma impressão digital
+    são carregadas do disco em vez de recalculadas.
+    """
+
+    def __init__(self, directory="checkpoints", stages=(), force_from=None, metrics=None):
+        if force_from is not None and force_from not in stages:
+            raise ValueError(f"Etapa desconhecida: {force_from}. Etapas disponíveis: {', '.join(stages)}.")
+        self.directory = directory
+        self.stages = list(stages)
+        self.force_from = force_from
+        self._forcing = False
+        # MetricsManager opcional: tempo de cada etapa e se ela veio do checkpoint
+        self.metrics = metrics
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def fingerprint(name, inputs, config):
+        """
+        Hash do nome da etapa, da configuração e do conteúdo dos DataFrames de entrada.
+        """
+        digest = hashlib.sha256(name.encode("utf-8"))
+        digest.update(json.dumps(config, sort_keys=True, default=str).encode("utf-8"))
+        for df in inputs:
+            digest.update(json.dumps([str(column) for column in df.columns]).encode("utf-8"))
+            digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+        return digest.hexdigest()
+
+    def run_stage(self, name, fn, inputs=(), config=None, checkpoint=True):
+        """
+        Executa `fn(*inputs)` ou carrega o resultado salvo, se as entradas e a configuração não mudaram.
+        A partir da etapa `force_from`, todas as etapas são recalculadas.
+        `config` pode ser uma função: ela é avaliada antes da etapa, para a comparação, e novamente depois,
+        para a impressão digital salva (ex.: o estado de um arquivo que a própria etapa grava).
+        Com `checkpoint=False` a etapa é sempre executada e seu resultado não é salvo (ex.: uma coleta interrompida).
+        """
+        resolve_config = config if callable(config) else (lambda: config)
+        if self.force_from and name in self.stages \
+                and self.stages.index(name) >= self.stages.index(self.force_from):
+            self._forcing = True
+
+        with self.metrics.stage(name) if self.metrics else nullcontext({}) as entry:
+            fingerprint = self.fingerprint(name, inputs, resolve_config() or {})
+            if checkpoint and not self._forcing and self._saved_fingerprint(name) == fingerprint:
+                df = self._load(name)
+                if df is not None:
+                    print(f"Etapa '{name}' sem alterações. Carregando resultado salvo ({len(df)} artigos).")
+                    entry.update(checkpoint=True, artigos=len(df))
+                    return df
+
+            df = fn(*inputs)
+            if checkpoint:
+                if callable(config):
+                    fingerprint = self.fingerprint(name, inputs, resolve_config() or {})
+                self._save(name, df, fingerprint)
+            entry.update(checkpoint=False, artigos=len(df))
+            return df
+
+    def load(self, name):
+        """
+        Retorna o último resultado salvo de uma etapa, sem verificar a impressão digital.
+        """
+        df = self._load(name)
+        if df is None:
+            raise FileNotFoundError(
+                f"Nenhum resultado salvo para a etapa '{name}' em {self.directory}. Execute o funil antes."
+            )
+        return df
+
+    def _path(self, name, extension):
+        return os.path.join(self.directory, f"{name}.{extension}")
+
+    def _saved_meta(self, name):
+        try:
+            with open(self._path(name, "json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _saved_fingerprint(self, name):
+        return self._saved_meta(name).get("fingerprint")
+
+    def _load(self, name):
+        file_name = self._saved_meta(name).get("file")
+        path = os.path.join(self.directory, file_name) if file_name else None
+        if not path or not os.path.exists(path):
+            return None
+        return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_pickle(path)
+
+    def _save(self, name, df, fingerprint):
+        # Parquet requer pyarrow ou fastparquet; sem eles o checkpoint é salvo em pickle
+        try:
+            path = self._path(name, "parquet")
+            df.to_parquet(f"{path}.tmp")
+        except ImportError:
+            path = self._path(name, "pkl")
+            df.to_pickle(f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+
+        # Os metadados são gravados por último: uma interrupção nunca deixa um checkpoint incompleto válido
+        with open(self._path(name, "json"), "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "rows": len(df), "file": os.path.basename(path)}, f)
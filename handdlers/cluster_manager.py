@@ -0,0 +1,105 @@
+import numpy as np
+from handdlers.similarity_manager import SimilarityIndex
+
+
+class ClusterManager:
+    """
+    Agrupa artigos a partir da matriz de embeddings (por exemplo, o memmap do EmbeddingStore),
+    lida em blocos: MiniBatchKMeans para os rótulos e IncrementalPCA para a projeção 2D.
+    Sem `n_clusters`, o número de grupos é escolhido pelo coeficiente de silhueta em uma amostra.
+    Apenas os rótulos e as coordenadas voltam para o DataFrame.
+    O scikit-learn só é importado quando o agrupamento é executado.
+    """
+
+    def __init__(self, n_clusters=None, k_range=(2, 12), sample_size=5000, batch_size=4096, random_state=42):
+        self.n_clusters = n_clusters
+        self.k_range = k_range
+        self.sample_size = sample_size
+        self.batch_size = batch_size
+        self.random_state = random_state
+        self.silhouettes = {}
+
+    def _chunks(self, matrix, rows):
+        """
+        Percorre as linhas em blocos de `batch_size`, normalizados (similaridade de cosseno).
+        """
+        for start in range(0, len(rows), self.batch_size):
+            yield start, SimilarityIndex.normalize(matrix[rows[start:start + self.batch_size]])
+
+    def _sample(self, matrix, rows):
+        rng = np.random.default_rng(self.random_state)
+        positions = np.sort(rng.choice(len(rows), size=min(self.sample_size, len(rows)), replace=False))
+        return SimilarityIndex.normalize(matrix[rows[positions]])
+
+    def select_k(self, sample):
+        """
+        Escolhe o número de grupos com maior coeficiente de silhueta na amostra.
+        """
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.metrics import silhouette_score
+
+        k_min, k_max = self.k_range
+        candidates = range(max(2, k_min), min(k_max, len(sample) - 1) + 1)
+        self.silhouettes = {}
+        for k in candidates:
+            labels = MiniBatchKMeans(n_clusters=k, batch_size=self.batch_size, n_init=3,
+                                     random_state=self.random_state).fit_predict(sample)
+            self.silhouettes[k] = float(silhouette_score(sample, labels, random_state=self.random_state))
+        if not self.silhouettes:
+            return 1
+        best_k = max(self.silhouettes, key=self.silhouettes.get)
+        print(f"Número de grupos escolhido pela silhueta: {best_k} (silhueta = {self.silhouettes[best_k]:.3f})")
+        return best_k
+
+    def fit_predict(self, matrix, rows=None):
+        """
+        Retorna o rótulo de grupo de cada linha. O modelo é iniciado na amostra e refinado
+        com uma passada de partial_fit sobre todos os blocos.
+        """
+        from sklearn.cluster import MiniBatchKMeans
+
+        rows = np.arange(len(matrix)) if rows is None else np.asarray(rows)
+        sample = self._sample(matrix, rows)
+        k = self.n_clusters or self.select_k(sample)
+        k = min(k, len(sample))
+
+        kmeans = MiniBatchKMeans(n_clusters=k, batch_size=self.batch_size, n_init=3, random_state=self.random_state)
+        kmeans.fit(sample)
+        for _, chunk in self._chunks(matrix, rows):
+            kmeans.partial_fit(chunk)
+
+        labels = np.empty(len(rows), dtype=np.int32)
+        for start, chunk in self._chunks(matrix, rows):
+            labels[start:start + len(chunk)] = kmeans.predict(chunk)
+        return labels
+
+    def project(self, matrix, rows=None, n_components=2):
+        """
+        Projeção em `n_components` dimensões com PCA incremental, bloco a bloco.
+        """
+        from sklearn.decomposition import IncrementalPCA
+
+        rows = np.arange(len(matrix)) if rows is None else np.asarray(rows)
+        pca = IncrementalPCA(n_components=n_components)
+        for _, chunk in self._chunks(matrix, rows):
+            # Cada bloco do partial_fit precisa ter pelo menos n_components linhas
+            if len(chunk) >= n_components:
+                pca.partial_fit(chunk)
+
+        coordinates = np.empty((len(rows), n_components), dtype=np.float32)
+        for start, chunk in self._chunks(matrix, rows):
+            coordinates[start:start + len(chunk)] = pca.transform(chunk)
+        return coordinates
+
+    def cluster_dataframe(self, df, matrix, rows=None, method='OpenAI'):
+        """
+        Grava em `df` as colunas usadas por VisualizationManager.plot_clusters:
+        'Cluster {method}', 'PCA_{method}_1' e 'PCA_{method}_2'.
+        """
+        if len(df) < 3:
+            raise ValueError("São necessários pelo menos 3 artigos para agrupar.")
+        print(f"Agrupando {len(df)} artigos...")
+        df[f'Cluster {method}'] = self.fit_predict(matrix, rows)
+        coordinates = self.project(matrix, rows)
+        df[f'PCA_{method}_1'], df[f'PCA_{method}_2'] = coordinates[:, 0], coordinates[:, 1]
+        return df
@@ -1,7 +1,12 @@
 import pandas as pd
 import re
+from handdlers.source_normalizer import SourceNormalizer
 
 class DataProcessor:
+    def __init__(self, rules_file=None):
+        # Regras de normalização de fontes (padrão: handdlers/fontes.json)
+        self.source_normalizer = SourceNormalizer(rules_file)
+
     def preprocess_data(self, df):
         """
         Limpa e normaliza os dados coletados.
@@ -9,47 +14,22 @@ class DataProcessor:
         # Limpeza da coluna 'Data de Publicação'
         if 'Data de Publicação' in df.columns:
             # Converter para numérico e tratar valores ausentes
-            df['Data de Publicação'] = pd.to_numeric(df['Data de Publicação'], errors='coerce').fillna(0).astype(int)
+            df['Data de Publicação'] = pd.to_numeric(df['Data de Publicação'], errors='coerce').fillna(0).astype('int16')
         else:
             print("Aviso: Coluna 'Data de Publicação' não encontrada. Adicionando uma coluna com valores padrão.")
             df['Data de Publicação'] = 0  # Adiciona coluna com valor 0 por padrão
 
         # Normalizar a coluna 'Fonte'
-        df['Fonte Normalizada'] = df['Fonte'].apply(self.normalizar_fonte)
+        df['Fonte Normalizada'] = self.source_normalizer.normalize_series(df['Fonte'])
 
         return df
 
     def normalizar_fonte(self, fonte):
         """
-        Normaliza nomes de fontes semelhantes usando regex.
+        Normaliza nomes de fontes semelhantes usando as regras regex configuradas.
         Se nenhuma correspondência for encontrada, retorna "Outras".
         """
-        if isinstance(fonte, str):
-            fonte = fonte.lower()
-
-            # Mapeamento de fontes utilizando regex
-            mapeamentos = {
-                r'.*ieee.*': 'IEEE',
-                r'.*arxiv.*': 'Arxiv',
-                r'.*neural.*': 'Neural Networks',
-                r'.*proceedings.*': 'Proceedings',
-                r'.*springer.*': 'Springer',
-                r'.*elsevier.*': 'Elsevier',
-                r'.*wiley.*': 'Wiley',
-                r'.*nature.*': 'Nature',
-                r'.*science.*': 'Science',
-                r'.*sensors.*': 'Sensors',
-                r'.*remote sensing.*': 'Remote Sensing',
-                r'.*expert systems.*': 'Expert Systems',
-                r'.*pattern recognition.*': 'Pattern Recognition'
-            }
-
-            # Iterar sobre o dicionário de regex e aplicar a normalização
-            for padrao, nome_normalizado in mapeamentos.items():
-                if re.match(padrao, fonte):
-                    return nome_normalizado
-
-        return 'Outras'  # Se não houver correspondência, retorna "Outras"
+        return self.source_normalizer.normalize(fonte)
 
     def filter_by_top_sources(self, df, top_n=10):
         """
@@ -57,18 +37,44 @@ class DataProcessor:
         """
         contagem_fonte = df['Fonte Normalizada'].value_counts()
         top_fontes = contagem_fonte.nlargest(top_n).index.tolist()
-        df['Fonte Agrupada'] = df['Fonte Normalizada'].apply(lambda x: x if x in top_fontes else 'Outras')
+        fonte_normalizada = df['Fonte Normalizada'].astype(object)
+        df['Fonte Agrupada'] = fonte_normalizada.where(fonte_normalizada.isin(top_fontes), 'Outras')
         return df
 
-    def filter_by_keywords(self, df):
+    def filter_by_keywords(self, df, keywords=None, index=None):
         """
         Filtra os artigos com base em palavras-chave relevantes.
         Exemplo: apenas artigos que mencionam 'transformer', 'attention', 'aggregation'.
+        Com um índice invertido (InvertedIndex), a filtragem é uma consulta por prefixo no índice
+        (título + snippet) em vez de uma varredura do título.
         """
-        keywords = ['transformer', 'attention', 'aggregation']
-        pattern = '|'.join(keywords)
+        if keywords is None:
+            keywords = ['transformer', 'attention', 'aggregation']
+        if index is not None:
+            return df[index.match_group(keywords, prefix=True)[df.index]]
+        pattern = '|'.join(re.escape(keyword) for keyword in keywords)
         return df[df['Título'].str.contains(pattern, case=False, na=False)]
 
+    def keyword_scores(self, df, keyword_groups, columns=('Título', 'Snippet'), index=None):
+        """
+        Calcula uma pontuação léxica entre 0 e 1: a fração dos grupos de palavras-chave
+        (por exemplo, os grupos OR da query) com pelo menos um termo presente no texto do artigo.
+        Com um índice invertido, cada grupo vira uma consulta no índice (título + snippet).
+        """
+        if not keyword_groups:
+            return pd.Series(1.0, index=df.index)
+
+        if index is not None:
+            matched = sum(index.match_group(group, prefix=True)[df.index].astype(int) for group in keyword_groups)
+            return pd.Series(matched / len(keyword_groups), index=df.index)
+
+        text = df[list(columns)].fillna('').astype(str).agg(' '.join, axis=1)
+        matched = pd.Series(0, index=df.index)
+        for group in keyword_groups:
+            pattern = '|'.join(re.escape(term) for term in group)
+            matched += text.str.contains(pattern, case=False, regex=True).astype(int)
+        return matched / len(keyword_groups)
+
     def final_refinement(self, df):
         """
         Refinamento final dos artigos, como filtragem por ano de publicação recente ou número de citações.
@@ -0,0 +1,139 @@
+import re
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class DedupManager:
+    """
+    Detecta artigos quase duplicados (arXiv + versão publicada, títulos variantes, snippets truncados)
+    com assinaturas MinHash sobre shingles de caracteres do título + snippet e LSH por bandas.
+    Cada balde do LSH é comparado apenas com o seu primeiro elemento, então o custo cresce
+    linearmente com o número de artigos.
+    """
+
+    def __init__(self, num_perm=64, bands=16, shingle_size=5, threshold=0.5, policy="longest", seed=42):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm deve ser múltiplo de bands.")
+        if policy not in ("first", "longest", "newest"):
+            raise ValueError(f"Política de representante desconhecida: {policy}. Use 'first', 'longest' ou 'newest'.")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.policy = policy
+        rng = np.random.default_rng(seed)
+        # Hash multiply-shift: (a * x + b) >> 32 com aritmética de 64 bits (a ímpar)
+        self._a = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64)
+        self._powers = np.uint64(257) ** np.arange(shingle_size - 1, -1, -1, dtype=np.uint64)
+        self.report = {}
+
+    def _normalize(self, text):
+        text = re.sub(r'[^a-z0-9]+', ' ', str(text).lower()).strip()
+        # Textos mais curtos que um shingle viram um único shingle
+        return text.ljust(self.shingle_size) if text else text
+
+    def signatures(self, texts, chunk_size=5000, perm_chunk=16):
+        """
+        Calcula a matriz de assinaturas MinHash (n_textos x num_perm).
+        Os shingles de todos os textos de um bloco são obtidos de uma vez com um hash polinomial
+        sobre janelas deslizantes. Textos vazios ficam marcados em `empty` e nunca são considerados duplicatas.
+        """
+        k = self.shingle_size
+        signatures = np.full((len(texts), self.num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+        empty = np.zeros(len(texts), dtype=bool)
+
+        for start in range(0, len(texts), chunk_size):
+            normalized = [self._normalize(text) for text in texts[start:start + chunk_size]]
+            lengths = np.array([len(text) for text in normalized], dtype=np.int64)
+            empty[start:start + len(normalized)] = lengths == 0
+            if not lengths.any():
+                continue
+
+            buffer = np.frombuffer("\n".join(normalized).encode("ascii"), dtype=np.uint8).astype(np.uint64)
+            gram_hashes = (sliding_window_view(buffer, k) * self._powers).sum(axis=1)
+
+            # Mantém apenas as janelas inteiramente dentro de um texto
+            doc_starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+            positions = np.arange(len(gram_hashes))
+            doc_of_position = np.searchsorted(doc_starts, positions, side="right") - 1
+            valid = positions + k <= doc_starts[doc_of_position] + lengths[doc_of_position]
+            gram_hashes, doc_of_position = gram_hashes[valid], doc_of_position[valid]
+
+            docs_with_grams = np.flatnonzero(lengths > 0)
+            offsets = np.searchsorted(doc_of_position, docs_with_grams)
+            for p in range(0, self.num_perm, perm_chunk):
+                a = self._a[p:p + perm_chunk, None]
+                b = self._b[p:p + perm_chunk, None]
+                permuted = ((a * gram_hashes[None, :] + b) >> np.uint64(32)).astype(np.uint32)
+                signatures[start + docs_with_grams, p:p + perm_chunk] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        return signatures, empty
+
+    def find_clusters(self, texts):
+        """
+        Retorna, para cada texto, o id do grupo de duplicatas ao qual pertence.
+        """
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+
+        signatures, empty = self.signatures(texts)
+        rows = self.num_perm // self.bands
+        candidates = np.flatnonzero(~empty)
+        edges_from, edges_to = [], []
+        for band in range(self.bands):
+            band_values = np.ascontiguousarray(signatures[candidates, band * rows:(band + 1) * rows])
+            keys = band_values.view(np.dtype((np.void, rows * band_values.itemsize))).ravel()
+            # Primeiro artigo de cada balde e o balde de cada artigo
+            _, first, bucket = np.unique(keys, return_index=True, return_inverse=True)
+            anchors = candidates[first[bucket.ravel()]]
+            pairs = candidates != anchors
+            members, anchors = candidates[pairs], anchors[pairs]
+
+            # Confirma os candidatos com a similaridade de Jaccard estimada pela assinatura completa
+            similarity = (signatures[members] == signatures[anchors]).mean(axis=1)
+            confirmed = similarity >= self.threshold
+            edges_from.append(members[confirmed])
+            edges_to.append(anchors[confirmed])
+
+        edges_from = np.concatenate(edges_from) if edges_from else np.empty(0, dtype=np.int64)
+        edges_to = np.concatenate(edges_to) if edges_to else np.empty(0, dtype=np.int64)
+        graph = coo_matrix((np.ones(len(edges_from), dtype=np.int8), (edges_from, edges_to)),
+                           shape=(len(texts), len(texts)))
+        return connected_components(graph, directed=False)[1]
+
+    def deduplicate(self, df):
+        """
+        Mantém um representante por grupo de quase duplicatas, escolhido pela política configurada:
+        "first" (melhor posição na busca), "longest" (snippet mais longo) ou "newest" (publicação mais recente).
+        A coluna 'Duplicatas' indica quantas cópias cada representante substitui.
+        """
+        if df.empty:
+            self.report = {"entrada": 0, "grupos": 0, "removidos": 0}
+            return df
+
+        texts = (df['Título'].fillna('').astype(str) + ' ' + df['Snippet'].fillna('').astype(str)).tolist()
+        clusters = self.find_clusters(texts)
+
+        order = np.arange(len(df))
+        if self.policy == "longest":
+            priority = -df['Snippet'].fillna('').astype(str).str.len().to_numpy()
+        elif self.policy == "newest":
+            priority = -df['Data de Publicação'].fillna(0).to_numpy(dtype=np.int64)
+        else:
+            priority = order
+        # Ordena por grupo e prioridade (empates mantêm a ordem original) e pega o primeiro de cada grupo
+        ranking = np.lexsort((order, priority, clusters))
+        is_first = np.ones(len(ranking), dtype=bool)
+        is_first[1:] = clusters[ranking][1:] != clusters[ranking][:-1]
+        representatives = np.sort(ranking[is_first])
+
+        copies = np.bincount(clusters, minlength=len(df))
+        result = df.iloc[representatives].copy()
+        result['Duplicatas'] = copies[clusters[representatives]] - 1
+
+        self.report = {
+            "entrada": len(df),
+            "grupos": int((copies > 1).sum()),
+            "removidos": len(df) - len(result),
+        }
+        return result
@@ -0,0 +1,270 @@
+import os
+import re
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+from handdlers.cache_manager import CacheMissError
+
+
+class EmbeddingStore:
+    """
+    Armazena embeddings em disco endereçados por hash(modelo, texto).
+    Os metadados ficam em SQLite e os vetores em uma matriz float32 por modelo,
+    lida via memmap para evitar cópias e parsing ao carregar milhares de vetores.
+    """
+
+    def __init__(self, directory="cache_embeddings"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, model TEXT NOT NULL, row INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS models (model TEXT PRIMARY KEY, dim INTEGER NOT NULL)")
+        self._conn.commit()
+        self._memmaps = {}
+
+    @staticmethod
+    def make_key(model, text):
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _matrix_path(self, model):
+        safe_model = re.sub(r'[^\w.-]', '_', model)
+        return os.path.join(self.directory, f"{safe_model}.f32")
+
+    def _dim(self, model):
+        row = self._conn.execute("SELECT dim FROM models WHERE model = ?", (model,)).fetchone()
+        return row[0] if row else None
+
+    def matrix(self, model):
+        """
+        Retorna a matriz de embeddings do modelo como memmap somente leitura (linhas x dimensão).
+        """
+        dim = self._dim(model)
+        path = self._matrix_path(model)
+        if dim is None or not os.path.exists(path):
+            return np.empty((0, dim or 0), dtype=np.float32)
+
+        n_rows = os.path.getsize(path) // (dim * 4)
+        cached = self._memmaps.get(model)
+        if cached is None or cached.shape[0] != n_rows:
+            cached = np.memmap(path, dtype=np.float32, mode="r", shape=(n_rows, dim)) if n_rows else \
+                np.empty((0, dim), dtype=np.float32)
+            self._memmaps[model] = cached
+        return cached
+
+    def lookup(self, model, texts):
+        """
+        Retorna o número da linha de cada texto na matriz do modelo, ou -1 se ainda não foi calculado.
+        """
+        keys = [self.make_key(model, text) for text in texts]
+        found = {}
+        # Consulta em blocos para respeitar o limite de parâmetros do SQLite
+        for start in range(0, len(keys), 900):
+            chunk = keys[start:start + 900]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(self._conn.execute(
+                f"SELECT key, row FROM embeddings WHERE key IN ({placeholders})", chunk
+            ).fetchall())
+        return np.array([found.get(key, -1) for key in keys], dtype=np.int64)
+
+    def add(self, model, texts, vectors):
+        """
+        Acrescenta novos vetores ao final da matriz do modelo e registra suas chaves.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(texts) == 0:
+            return
+        dim = self._dim(model)
+        if dim is None:
+            dim = vectors.shape[1]
+            self._conn.execute("INSERT INTO models (model, dim) VALUES (?, ?)", (model, dim))
+        elif dim != vectors.shape[1]:
+            raise ValueError(f"Dimensão {vectors.shape[1]} incompatível com a dimensão {dim} já armazenada para {model}.")
+
+        path = self._matrix_path(model)
+        # Os vetores são gravados antes do índice: uma interrupção deixa apenas linhas órfãs.
+        # Uma linha gravada pela metade é descartada, para que as próximas não fiquem desalinhadas
+        row_bytes = dim * 4
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size % row_bytes:
+            os.truncate(path, size - size % row_bytes)
+        first_row = size // row_bytes
+        with open(path, "ab") as f:
+            f.write(vectors.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, model, row) VALUES (?, ?, ?)",
+            [(self.make_key(model, text), model, first_row + i) for i, text in enumerate(texts)]
+        )
+        self._conn.commit()
+
+
+class OpenAIEmbeddingBackend:
+    """
+    Backend de embeddings da OpenAI: agrupa vários textos por requisição e executa os lotes
+    em paralelo pelo LLMManager (limite de taxa e novas tentativas).
+    """
+
+    def __init__(self, llm_manager, model="text-embedding-ada-002", max_batch_size=512, max_batch_tokens=100000):
+        self.llm_manager = llm_manager
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+
+    @property
+    def name(self):
+        return self.model
+
+    def embed(self, texts):
+        batches = list(self._make_batches(texts))
+        token_estimates = [sum(self.estimate_tokens(text) for text in batch) for batch in batches]
+        results = self.llm_manager.map(self._create_embeddings, batches, token_estimates)
+        return np.vstack(results) if results else np.empty((0, 0), dtype=np.float32)
+
+    def _create_embeddings(self, batch):
+        import openai
+
+        kwargs = {"model": self.model, "input": batch, **self.llm_manager.request_options()}
+        response = openai.Embedding.create(**kwargs)
+        self.llm_manager.record_usage(response, "embeddings")
+        data = sorted(response['data'], key=lambda item: item['index'])
+        return np.array([item['embedding'] for item in data], dtype=np.float32)
+
+    def _make_batches(self, texts):
+        """
+        Agrupa os textos em lotes limitados pelo número de itens e pela estimativa de tokens por requisição.
+        """
+        batch, batch_tokens = [], 0
+        for text in texts:
+            tokens = self.estimate_tokens(text)
+            if batch and (len(batch) >= self.max_batch_size or batch_tokens + tokens > self.max_batch_tokens):
+                yield batch
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            yield batch
+
+    @staticmethod
+    def estimate_tokens(text):
+        return len(text) // 4 + 1
+
+
+class SentenceTransformerBackend:
+    """
+    Backend local (CPU) com sentence-transformers, sem custo nem acesso à rede após o download do modelo.
+    `backend="onnx"` e `onnx_file_name` permitem carregar modelos ONNX/quantizados (sentence-transformers >= 3.2).
+    """
+
+    def __init__(self, model_name="all-MiniLM-L6-v2", batch_size=64, num_threads=None,
+                 backend="torch", onnx_file_name=None, device="cpu"):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.backend = backend
+        self.onnx_file_name = onnx_file_name
+        self.device = device
+        self._model = None
+
+    @property
+    def name(self):
+        # Modelos ONNX/quantizados geram vetores ligeiramente diferentes e não devem compartilhar o cache
+        suffix = f"-{self.backend}" if self.backend != "torch" else ""
+        if self.onnx_file_name:
+            suffix += f"-{self.onnx_file_name}"
+        return f"sentence-transformers/{self.model_name}{suffix}"
+
+    def _load_model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            if self.num_threads:
+                import torch
+                torch.set_num_threads(self.num_threads)
+
+            kwargs = {"device": self.device}
+            if self.backend != "torch":
+                kwargs["backend"] = self.backend
+            if self.onnx_file_name:
+                kwargs["model_kwargs"] = {"file_name": self.onnx_file_name}
+            print(f"Carregando o modelo local de embeddings {self.model_name}...")
+            self._model = SentenceTransformer(self.model_name, **kwargs)
+        return self._model
+
+    def embed(self, texts):
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        vectors = self._load_model().encode(
+            list(texts), batch_size=self.batch_size, convert_to_numpy=True, show_progress_bar=False
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class EmbeddingManager:
+    """
+    Gera embeddings com o backend configurado e reaproveita os vetores já armazenados.
+    No modo offline usa apenas o armazenamento: um texto sem embedding salvo levanta CacheMissError.
+    Pode ser usado por várias threads: só o acesso ao EmbeddingStore é serializado, não a chamada ao backend.
+    """
+
+    def __init__(self, backend, store=None, offline=False):
+        self.backend = backend
+        self.store = store
+        self.offline = offline
+        self._store_lock = threading.Lock()
+
+    @property
+    def model(self):
+        return self.backend.name
+
+    def embed(self, texts):
+        """
+        Retorna uma matriz float32 (n_textos x dimensão) com os embeddings dos textos.
+        Apenas textos novos ou alterados são enviados ao backend.
+        """
+        matrix, rows = self.embedding_rows(texts)
+        return np.asarray(matrix[rows])
+
+    def embedding_rows(self, texts):
+        """
+        Garante que todos os textos tenham embedding e retorna (matriz, linhas): o embedding do i-ésimo
+        texto é `matriz[linhas[i]]`. Com o armazenamento em disco, a matriz é o memmap do cache,
+        sem cópia para a memória.
+        """
+        texts = [self._clean(text) for text in texts]
+        if self.store is None:
+            if self.offline and texts:
+                raise CacheMissError(
+                    f"{len(texts)} textos sem embedding armazenado: o modo offline exige o cache de embeddings."
+                )
+            unique_texts = list(dict.fromkeys(texts))
+            vectors = self.backend.embed(unique_texts)
+            position = {text: i for i, text in enumerate(unique_texts)}
+            return vectors, np.array([position[text] for text in texts], dtype=np.int64)
+
+        with self._store_lock:
+            rows = self.store.lookup(self.model, texts)
+        missing = list(dict.fromkeys(text for text, row in zip(texts, rows) if row < 0))
+        if missing and self.offline:
+            raise CacheMissError(
+                f"{len(missing)} textos não têm embedding no cache e o modo offline está ativo."
+            )
+        if missing:
+            print(f"Gerando embeddings para {len(missing)} textos novos de um total de {len(texts)}...")
+            vectors = self.backend.embed(missing)
+            with self._store_lock:
+                self.store.add(self.model, missing, vectors)
+                rows = self.store.lookup(self.model, texts)
+        else:
+            print(f"Todos os {len(texts)} embeddings foram carregados do cache.")
+        with self._store_lock:
+            return self.store.matrix(self.model), rows
+
+    @staticmethod
+    def _clean(text):
+        # A API rejeita entradas vazias
+        text = str(text).strip()
+        return text or " "
@@ -1,77 +1,185 @@
-import openai
+import os
+import re
+import json
+import time
+import numpy as np
 import pandas as pd
 from handdlers.search_manager import SearchManager
 from handdlers.data_processor import DataProcessor
 from handdlers.visualization_manager import VisualizationManager
+from handdlers.llm_manager import LLMManager
+from handdlers.embedding_manager import (
+    EmbeddingManager, EmbeddingStore, OpenAIEmbeddingBackend, SentenceTransformerBackend
+)
+from handdlers.cache_manager import ResponseCache
+from handdlers.query_parser import parse_query_groups
+from handdlers.similarity_manager import SimilarityIndex
+from handdlers.index_manager import InvertedIndex
+from handdlers.checkpoint_manager import CheckpointManager
+from handdlers.dedup_manager import DedupManager
+from handdlers.cluster_manager import ClusterManager
+from handdlers.metrics_manager import MetricsManager
+from handdlers.pdf_manager import PdfManager
+from handdlers.stages import FUNNEL_STAGES
+
+SYSTEM_PROMPT = "Você é um assistente especializado em análise de artigos científicos."
+
+# Limiares padrão da triagem em cascata (léxico -> embeddings -> LLM)
+DEFAULT_CASCADE_CONFIG = {
+    "lexical_min_score": 0.5,   # fração mínima dos grupos da query presentes no título/resumo
+    "embedding_reject": 0.75,   # abaixo deste cosseno o artigo é descartado sem chamar o LLM
+    "embedding_accept": 0.85,   # a partir deste cosseno o artigo é aceito sem chamar o LLM
+}
 
 class FunnelManager:
-    def __init__(self, query, project_title, openai_api_key, max_articles=1000):
-        self.search_manager = SearchManager(query, num_results=max_articles)
+    def __init__(self, query, project_title, openai_api_key, max_articles=1000,
+                 max_concurrency=8, requests_per_minute=500, tokens_per_minute=200000, api_base=None,
+                 embedding_cache_dir="cache_embeddings", response_cache_path="cache_respostas.sqlite",
+                 offline=False, screening_mode="individual", batch_size=20, score_threshold=0.5,
+                 use_cascade=False, cascade_config=None, embedding_backend="openai", ann_index_path=None,
+                 checkpoint_dir="checkpoints", force_from=None, search_options=None,
+                 deduplicate=True, dedup_options=None, visualization_options=None, cluster_options=None,
+                 metrics_options=None, pdf_options=None, response_cache_options=None):
+        # Tempos, contadores e latências da execução (ex.: {"profile_stage": "resumos", "trace_memory": True})
+        self.metrics = MetricsManager(**(metrics_options or {}))
+        self.search_manager = SearchManager(query, num_results=max_articles, metrics=self.metrics, **(search_options or {}))
         self.data_processor = DataProcessor()
-        self.visualization_manager = VisualizationManager()
+        # Ex.: {"headless": True, "output_formats": ["png", "html"]} para execuções sem interface gráfica
+        self.visualization_manager = VisualizationManager(metrics=self.metrics, **(visualization_options or {}))
+        # Ex.: {"max_entries": 100000, "max_age_days": 30}; as entradas expiradas são removidas na inicialização
+        response_cache = None
+        if response_cache_path:
+            response_cache = ResponseCache(response_cache_path, offline=offline, **(response_cache_options or {}))
+            evicted = response_cache.evict_expired()
+            if evicted:
+                print(f"{evicted} respostas expiradas removidas do cache.")
+        self.llm_manager = LLMManager(
+            max_workers=max_concurrency,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            api_base=api_base,
+            cache=response_cache,
+            metrics=self.metrics,
+            api_key=openai_api_key
+        )
+        self.embedding_manager = EmbeddingManager(
+            self._make_embedding_backend(embedding_backend),
+            store=EmbeddingStore(embedding_cache_dir) if embedding_cache_dir else None,
+            offline=offline
+        )
+        # "individual": uma chamada por artigo e busca de palavras na resposta;
+        # "batch": vários artigos por chamada, com pontuações numéricas em JSON
+        if screening_mode not in ("individual", "batch"):
+            raise ValueError(f"Modo de triagem desconhecido: {screening_mode}. Use 'individual' ou 'batch'.")
+        self.screening_mode = screening_mode
+        self.batch_size = batch_size
+        self.score_threshold = score_threshold
+        self.use_cascade = use_cascade
+        self.cascade_config = {**DEFAULT_CASCADE_CONFIG, **(cascade_config or {})}
+        self.cascade_stats = []
+        # Caminho do índice HNSW salvo; se definido, rankings com top_k usam busca aproximada
+        self.ann_index_path = ann_index_path
+        # Remoção de quase duplicatas (MinHash/LSH) antes das etapas pagas
+        self.deduplicate = deduplicate
+        self.dedup_options = dedup_options or {}
+        self.dedup_manager = DedupManager(**self.dedup_options)
+        # Agrupamento sobre a matriz de embeddings em cache (ex.: {"n_clusters": 8} ou {"k_range": [2, 20]})
+        self.cluster_manager = ClusterManager(**(cluster_options or {}))
+        # Extração e divisão em seções dos PDFs do próprio trabalho (ex.: {"max_chunk_chars": 1500})
+        self.pdf_manager = PdfManager(metrics=self.metrics, **(pdf_options or {}))
+        self.checkpoint_manager = CheckpointManager(
+            checkpoint_dir, stages=FUNNEL_STAGES, force_from=force_from, metrics=self.metrics
+        )
+        self.articles_file = "artigos_google_scholar.jsonl"
         self.project_title = project_title
         self.openai_api_key = openai_api_key
-        openai.api_key = openai_api_key
+
+    def _make_embedding_backend(self, embedding_backend):
+        """
+        Aceita "openai", "local" (sentence-transformers em CPU) ou uma instância de backend já configurada.
+        """
+        if embedding_backend == "openai":
+            return OpenAIEmbeddingBackend(self.llm_manager)
+        if embedding_backend == "local":
+            return SentenceTransformerBackend()
+        if isinstance(embedding_backend, str):
+            raise ValueError(f"Backend de embeddings desconhecido: {embedding_backend}. Use 'openai' ou 'local'.")
+        return embedding_backend
 
     def run_funnel(self):
+        """
+        Executa o funil como uma sequência de etapas nomeadas (ver FUNNEL_STAGES).
+        Cada etapa salva seu resultado em `checkpoint_dir`; uma nova execução pula as etapas cujas
+        entradas e configuração não mudaram. Dentro das etapas com GPT-4o Mini, as respostas já
+        obtidas ficam no cache de respostas, então uma etapa interrompida retoma apenas os artigos restantes.
+        """
+        checkpoints = self.checkpoint_manager
+
         # Etapa 0: Validação dos Dados Coletados
         print("Etapa 0: Validando os dados coletados...")
-        df = self.search_manager.collect_articles()
-        if df.empty:
-            raise ValueError("Nenhum artigo foi coletado. O processo será interrompido.")
+        # A configuração é reavaliada após a coleta, que grava o arquivo de artigos.
+        # Uma coleta ainda sem o marcador de conclusão nunca vem do checkpoint: ela é retomada
+        collection_complete = self.search_manager.is_complete(self.articles_file)
+        df = checkpoints.run_stage('coleta', self._collect_stage, config=self._collection_config,
+                                   checkpoint=collection_complete)
         print(f"Total de artigos coletados: {len(df)}")
+        # Índice invertido do corpus (carregado do disco quando a coleta vem do checkpoint)
+        self.search_manager.load_index(self.articles_file, df)
 
         # Etapa 1: Coleta de Artigos e Pré-processamento
         print("Etapa 1: Coletando artigos e fazendo pré-processamento...")
-        df = self.data_processor.preprocess_data(df)
+        df = checkpoints.run_stage('preprocessamento', self.data_processor.preprocess_data, [df])
         print(f"Total de artigos após pré-processamento: {len(df)}")
 
+        # Etapa 1.5: Remoção de Quase Duplicatas antes das etapas pagas
+        df_unique = df
+        if self.deduplicate:
+            print("Etapa 1.5: Removendo artigos quase duplicados (MinHash/LSH)...")
+            df_unique = checkpoints.run_stage(
+                'deduplicacao', self._dedup_stage, [df], config={"dedup_options": self.dedup_options}
+            )
+            self._report_dedup_savings(df, df_unique)
+            print(f"Total de artigos após remoção de duplicatas: {len(df_unique)}")
+
         # Etapa 2: Filtragem por Fontes Relevantes e Criação de Gráfico
         print("Etapa 2: Filtrando por fontes relevantes e criando gráfico...")
-        df_filtered_sources = self.data_processor.filter_by_top_sources(df)
+        df_filtered_sources = checkpoints.run_stage('fontes', self.data_processor.filter_by_top_sources, [df_unique])
         print(f"Total de artigos após filtragem por fontes: {len(df_filtered_sources)}")
         self.visualization_manager.create_line_chart(df_filtered_sources, output_file="artigos_filtrados_por_fonte_ano.png")
 
         # Etapa 3: Geração de Nuvem de Palavras
         print("Etapa 3: Gerando nuvens de palavras...")
-        self.visualization_manager.generate_word_cloud(df_filtered_sources, 'Título', output_dir="nuvens_palavras_titulo")
-        self.visualization_manager.generate_word_cloud(df_filtered_sources, 'Snippet', output_dir="nuvens_palavras_resumo")
+        self.visualization_manager.generate_word_clouds(df_filtered_sources, [
+            ('Título', "nuvens_palavras_titulo", 'title_summary'),
+            ('Snippet', "nuvens_palavras_resumo", 'title_summary'),
+        ])
 
         # Etapa 4: Filtragem por Similaridade de Resumos usando GPT-4o Mini
-        print("Etapa 4: Filtrando artigos com base na similaridade de resumos com GPT-4o Mini...")
-        df_similar_summaries = self.filter_by_summary_similarity(df_filtered_sources)
-
-        # Ajuste para garantir pelo menos 10 artigos
-        if len(df_similar_summaries) < 10:
-            print("Menos de 10 artigos após a filtragem por resumos. Afrouxando as restrições para incluir mais artigos.")
-            df_similar_summaries = df_filtered_sources  # Afrouxa a filtragem, retornando ao conjunto filtrado por fonte
+        df_similar_summaries = checkpoints.run_stage(
+            'resumos', self._summary_stage, [df_filtered_sources], config=self._screening_config()
+        )
         print(f"Total de artigos após filtragem por similaridade de resumos: {len(df_similar_summaries)}")
         self.visualization_manager.create_line_chart(df_similar_summaries, output_file="artigos_filtrados_por_resumo_ano.png")
 
         # Etapa 5: Análise de Similaridade com o Título do Projeto usando GPT-4o Mini
         print("Etapa 5: Analisando similaridade com o título do projeto usando GPT-4o Mini...")
-        similar_articles = self.analyze_similarity(df_similar_summaries)
-
-        # Garantir pelo menos 10 artigos após análise de similaridade
-        if len(similar_articles) < 10:
-            print("Menos de 10 artigos semelhantes ao título. Afrouxando as restrições para incluir mais artigos.")
-            similar_articles = df_similar_summaries  # Usa o conjunto filtrado por resumo se o número for insuficiente
+        similar_articles = checkpoints.run_stage(
+            'titulo', self._title_stage, [df_similar_summaries], config=self._screening_config()
+        )
         print(f"Total de artigos semelhantes ao título do projeto: {len(similar_articles)}")
         self.visualization_manager.create_line_chart(similar_articles, output_file="artigos_similares_por_fonte.png")
 
         # Etapa 6: Refinamento Final
         print("Etapa 6: Refinamento final dos artigos...")
-        refined_df = self.analyze_summary_similarity(similar_articles)
-
-        # Garantir pelo menos 10 artigos após o refinamento final
-        if len(refined_df) < 10:
-            print("Menos de 10 artigos após o refinamento final. Afrouxando as restrições.")
-            refined_df = similar_articles  # Retorna ao conjunto anterior se o refinamento resultar em menos de 10 artigos
+        refined_df = checkpoints.run_stage(
+            'refinamento', self._refinement_stage, [similar_articles], config=self._screening_config()
+        )
         print(f"Total de artigos após refinamento final: {len(refined_df)}")
 
         # Etapa Final: Gráfico de Funil mostrando a redução
         article_counts = [
             len(df),  # Artigos coletados
+            len(df_unique),  # Após remoção de duplicatas
             len(df_filtered_sources),  # Após filtragem por fontes
             len(df_similar_summaries),  # Após filtragem por resumos
             len(similar_articles),  # Após análise de similaridade
@@ -80,10 +188,176 @@ class FunnelManager:
 
         # Criar e plotar o gráfico de funil
         funnel_data = pd.DataFrame({
-            'Etapas': ['Coletados', 'Filtrados por Fonte', 'Filtrados por Resumo', 'Similares ao Título', 'Refinamento Final'],
+            'Etapas': ['Coletados', 'Sem Duplicatas', 'Filtrados por Fonte', 'Filtrados por Resumo', 'Similares ao Título', 'Refinamento Final'],
             'Quantidade de Artigos': article_counts
         })
-        self.visualization_manager.create_funnel_chart(funnel_data, output_file="funil_de_artigos.png")
+        funnel_chart_file = "funil_de_artigos.png"
+        self.visualization_manager.create_funnel_chart(funnel_data, output_file=funnel_chart_file)
+        # No modo headless os gráficos da execução são exportados aqui, em um único lote
+        self.visualization_manager.flush()
+
+        report = {"artigos_por_etapa": dict(zip(funnel_data['Etapas'], article_counts))}
+        if self.llm_manager.cache:
+            stats = self.llm_manager.cache.stats()
+            print(f"Cache de respostas: {stats['hits']} acertos, {stats['misses']} falhas, {stats['entries']} entradas.")
+            report["cache_respostas"] = stats
+        if self.deduplicate:
+            report["deduplicacao"] = self.dedup_manager.report
+        if self.use_cascade:
+            report["cascata"] = self.cascade_stats
+
+        # Relatório de tempo, custo e latência ao lado do gráfico de funil
+        self.metrics.save(f"{os.path.splitext(funnel_chart_file)[0]}_metricas.json", extra=report)
+
+    def _collect_stage(self):
+        df = self.search_manager.collect_articles(self.articles_file)
+        if df.empty:
+            raise ValueError("Nenhum artigo foi coletado. O processo será interrompido.")
+        return df
+
+    def _dedup_stage(self, df):
+        self.dedup_manager.report = {}
+        return self.dedup_manager.deduplicate(df.copy())
+
+    def _report_dedup_savings(self, df, df_unique):
+        report = self.dedup_manager.report
+        if not report:
+            # Etapa carregada do checkpoint: o relatório é refeito a partir da coluna 'Duplicatas'
+            copies = df_unique['Duplicatas'] if 'Duplicatas' in df_unique.columns else pd.Series(dtype=int)
+            report = self.dedup_manager.report = {
+                "entrada": len(df),
+                "grupos": int((copies > 0).sum()),
+                "removidos": len(df) - len(df_unique),
+            }
+        # Cada artigo removido deixa de passar pelas três etapas com GPT-4o Mini e pelo embedding
+        llm_calls_per_article = 3 if self.screening_mode == "individual" else 3 / self.batch_size
+        report["chamadas_llm_economizadas"] = round(report["removidos"] * llm_calls_per_article)
+        report["embeddings_economizados"] = report["removidos"]
+        print(
+            f"Duplicatas: {report['removidos']} artigos removidos em {report['grupos']} grupos. "
+            f"Economia estimada: {report['chamadas_llm_economizadas']} chamadas ao GPT-4o Mini "
+            f"e {report['embeddings_economizados']} embeddings."
+        )
+
+    def _summary_stage(self, df_filtered_sources):
+        if self.use_cascade:
+            print("Etapa 4: Filtrando artigos em cascata (palavras-chave, embeddings e GPT-4o Mini para os casos incertos)...")
+            df_similar_summaries = self.cascade_screen(df_filtered_sources.copy())
+        else:
+            print("Etapa 4: Filtrando artigos com base na similaridade de resumos com GPT-4o Mini...")
+            df_similar_summaries = self.filter_by_summary_similarity(df_filtered_sources.copy())
+
+        # Ajuste para garantir pelo menos 10 artigos
+        if len(df_similar_summaries) < 10:
+            print("Menos de 10 artigos após a filtragem por resumos. Afrouxando as restrições para incluir mais artigos.")
+            df_similar_summaries = df_filtered_sources  # Afrouxa a filtragem, retornando ao conjunto filtrado por fonte
+        return df_similar_summaries
+
+    def _title_stage(self, df_similar_summaries):
+        similar_articles = self.analyze_similarity(df_similar_summaries.copy())
+
+        # Garantir pelo menos 10 artigos após análise de similaridade
+        if len(similar_articles) < 10:
+            print("Menos de 10 artigos semelhantes ao título. Afrouxando as restrições para incluir mais artigos.")
+            similar_articles = df_similar_summaries  # Usa o conjunto filtrado por resumo se o número for insuficiente
+        return similar_articles
+
+    def _refinement_stage(self, similar_articles):
+        refined_df = self.analyze_summary_similarity(similar_articles.copy())
+
+        # Garantir pelo menos 10 artigos após o refinamento final
+        if len(refined_df) < 10:
+            print("Menos de 10 artigos após o refinamento final. Afrouxando as restrições.")
+            refined_df = similar_articles  # Retorna ao conjunto anterior se o refinamento resultar em menos de 10 artigos
+        return refined_df
+
+    def _collection_config(self):
+        # Inclui o estado do arquivo de resultados para detectar novos artigos coletados
+        config = {
+            "query": self.search_manager.query,
+            "sub_queries": self.search_manager.build_sub_queries(),
+            "num_results": self.search_manager.num_results,
+            "completo": self.search_manager.is_complete(self.articles_file),
+        }
+        input_file = self.search_manager.resolve_input_file(self.articles_file)
+        if os.path.exists(input_file):
+            stat = os.stat(input_file)
+            config["arquivo"] = [input_file, stat.st_size, stat.st_mtime_ns]
+        return config
+
+    def _screening_config(self):
+        return {
+            "project_title": self.project_title,
+            "screening_mode": self.screening_mode,
+            "batch_size": self.batch_size,
+            "score_threshold": self.score_threshold,
+            "use_cascade": self.use_cascade,
+            "cascade_config": self.cascade_config if self.use_cascade else None,
+            "embedding_model": self.embedding_manager.model if self.use_cascade else None,
+        }
+
+    def cascade_screen(self, df):
+        """
+        Triagem em cascata: pontuação léxica com os grupos da query, depois similaridade de embeddings
+        com o título do projeto e, por fim, GPT-4o Mini apenas para a faixa incerta entre os dois limiares.
+        As contagens e o tempo de cada nível ficam em `self.cascade_stats`.
+        """
+        config = self.cascade_config
+        self.cascade_stats = []
+        keep = pd.Series(False, index=df.index)
+
+        # Nível 1: palavras-chave da query, consultadas no índice invertido quando disponível
+        start = time.perf_counter()
+        index = self.search_manager.index
+        df['Pontuação Léxica'] = self.data_processor.keyword_scores(
+            df, parse_query_groups(self.search_manager.query), index=index
+        )
+        if index is not None:
+            df['Pontuação BM25'] = index.bm25(self.search_manager.query)[df.index]
+        candidates = df[df['Pontuação Léxica'] >= config['lexical_min_score']]
+        self._record_cascade_tier('Léxico', len(df), 0, len(df) - len(candidates), len(candidates), start)
+
+        # Nível 2: similaridade de embeddings com o título do projeto
+        start = time.perf_counter()
+        uncertain = candidates
+        if not candidates.empty:
+            article_texts = InvertedIndex.documents(candidates)
+            embeddings = self.embedding_manager.embed([self.project_title] + article_texts)
+            similarities = SimilarityIndex(embeddings[1:]).scores(embeddings[:1])[0]
+            df.loc[candidates.index, 'Similaridade Embedding'] = similarities
+
+            accepted = candidates.index[similarities >= config['embedding_accept']]
+            keep[accepted] = True
+            uncertain = candidates[(similarities >= config['embedding_reject']) & (similarities < config['embedding_accept'])]
+            rejected = len(candidates) - len(accepted) - len(uncertain)
+            self._record_cascade_tier('Embeddings', len(candidates), len(accepted), rejected, len(uncertain), start)
+
+        # Nível 3: LLM apenas para os casos incertos
+        start = time.perf_counter()
+        if not uncertain.empty:
+            llm_accepted = self.filter_by_summary_similarity(uncertain.copy())
+            keep[llm_accepted.index] = True
+            for column in ('Similaridade Resumo', 'Pontuação Resumo'):
+                if column in llm_accepted.columns:
+                    df.loc[llm_accepted.index, column] = llm_accepted[column]
+            self._record_cascade_tier('LLM', len(uncertain), len(llm_accepted), len(uncertain) - len(llm_accepted), 0, start)
+
+        for tier in self.cascade_stats:
+            print(
+                f"  {tier['nivel']}: {tier['entrada']} avaliados, {tier['aceitos']} aceitos, "
+                f"{tier['rejeitados']} descartados, {tier['escalados']} escalados ({tier['tempo_s']:.2f}s)"
+            )
+        return df[keep].copy()
+
+    def _record_cascade_tier(self, name, evaluated, accepted, rejected, escalated, start):
+        self.cascade_stats.append({
+            "nivel": name,
+            "entrada": evaluated,
+            "aceitos": accepted,
+            "rejeitados": rejected,
+            "escalados": escalated,
+            "tempo_s": time.perf_counter() - start,
+        })
 
     def filter_by_summary_similarity(self, df):
         """
@@ -92,17 +366,16 @@ class FunnelManager:
         if 'Snippet' not in df.columns:
             raise ValueError("A coluna 'Snippet' não foi encontrada no DataFrame.")
 
-        completions = []
-        for snippet in df['Snippet']:
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "Você é um assistente especializado em análise de artigos científicos."},
-                    {"role": "user", "content": f"Compare o seguinte resumo com o título do projeto: {self.project_title}. Resumo: {snippet}"}
-                ],
-                max_tokens=50
+        if self.screening_mode == "batch":
+            df['Pontuação Resumo'] = self._score_in_batches(
+                df['Snippet'], f"Avalie a relevância de cada resumo para o título do projeto: {self.project_title}."
             )
-            completions.append(response['choices'][0]['message']['content'].strip())
+            return df[df['Pontuação Resumo'] >= self.score_threshold].copy()
+
+        completions = self._chat_completions(
+            f"Compare o seguinte resumo com o título do projeto: {self.project_title}. Resumo: {snippet}"
+            for snippet in df['Snippet']
+        )
 
         # Adiciona as respostas ao DataFrame
         df['Similaridade Resumo'] = completions
@@ -123,17 +396,16 @@ class FunnelManager:
         if df.empty:
             raise ValueError("Nenhum artigo possui título válido após a limpeza.")
 
-        completions = []
-        for title in df['Título']:
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "Você é um assistente especializado em análise de artigos científicos."},
-                    {"role": "user", "content": f"Compare o seguinte título com o título do projeto: {self.project_title}. Título do Artigo: {title}"}
-                ],
-                max_tokens=50
+        if self.screening_mode == "batch":
+            df['Pontuação Título'] = self._score_in_batches(
+                df['Título'], f"Avalie a similaridade de cada título de artigo com o título do projeto: {self.project_title}."
             )
-            completions.append(response['choices'][0]['message']['content'].strip())
+            return df[df['Pontuação Título'] >= self.score_threshold].copy()
+
+        completions = self._chat_completions(
+            f"Compare o seguinte título com o título do projeto: {self.project_title}. Título do Artigo: {title}"
+            for title in df['Título']
+        )
 
         df['Similaridade'] = completions
         # Menos restritivo: aceita variações como "relacionado", "relevante", além de "similar"
@@ -153,65 +425,195 @@ class FunnelManager:
         if df.empty:
             raise ValueError("Nenhum artigo possui resumo válido após a limpeza.")
 
-        completions = []
-        for snippet in df['Snippet']:
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "Você é um assistente especializado em análise de artigos científicos."},
-                    {"role": "user", "content": f"Compare o seguinte resumo com o resumo do meu artigo: {self.project_title}. Resumo do Artigo: {snippet}"}
-                ],
-                max_tokens=50
+        if self.screening_mode == "batch":
+            df['Pontuação Resumo Final'] = self._score_in_batches(
+                df['Snippet'], f"Avalie a similaridade de cada resumo de artigo com o resumo do meu artigo: {self.project_title}."
             )
-            completions.append(response['choices'][0]['message']['content'].strip())
+            return df[df['Pontuação Resumo Final'] >= self.score_threshold].copy()
+
+        completions = self._chat_completions(
+            f"Compare o seguinte resumo com o resumo do meu artigo: {self.project_title}. Resumo do Artigo: {snippet}"
+            for snippet in df['Snippet']
+        )
 
         df['Similaridade Resumo'] = completions
         # Menos restritivo: aceita variações como "relacionado", "relevante", além de "similar"
         return df[df['Similaridade Resumo'].str.contains('similar|relevante|relacionado', case=False, na=False)].copy()
 
-    def compare_title_and_abstract(self, provided_title, provided_abstract, df):
+    def _chat_completions(self, prompts, model="gpt-4o-mini", max_tokens=50):
         """
-        Compara o título e o resumo fornecidos com os artigos coletados usando embeddings.
+        Envia um prompt por artigo ao GPT-4o Mini de forma concorrente, preservando a ordem de entrada.
         """
-        if 'Título' not in df.columns or 'Snippet' not in df.columns:
-            raise ValueError("As colunas 'Título' ou 'Snippet' não foram encontradas no DataFrame.")
+        requests = [
+            {
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                "max_tokens": max_tokens
+            }
+            for prompt in prompts
+        ]
+        return self.llm_manager.chat_completions(requests)
 
-        # Gerar embeddings para o título e resumo fornecidos
-        print("Gerando embeddings para o título e resumo fornecidos...")
-        response_title = openai.Embedding.create(
-            model="text-embedding-ada-002",
-            input=provided_title
+    def _score_in_batches(self, texts, instruction, max_rounds=3):
+        """
+        Classifica vários textos por chamada, pedindo uma pontuação de relevância entre 0 e 1 para cada id.
+        Ids ausentes ou inválidos na resposta são reenviados em novas rodadas; os que restarem recebem NaN.
+        """
+        texts = [str(text) for text in texts]
+        scores = np.full(len(texts), np.nan)
+        pending = list(range(len(texts)))
+
+        for _ in range(max_rounds):
+            if not pending:
+                break
+            batches = [pending[start:start + self.batch_size] for start in range(0, len(pending), self.batch_size)]
+            prompts = [self._build_batch_prompt(instruction, [(i, texts[i]) for i in batch]) for batch in batches]
+            responses = self._chat_completions(prompts, max_tokens=15 * self.batch_size + 20)
+
+            for batch, response in zip(batches, responses):
+                for item_id, score in self._parse_batch_scores(response, batch).items():
+                    scores[item_id] = score
+            pending = [i for i in pending if np.isnan(scores[i])]
+
+        if pending:
+            print(f"Aviso: {len(pending)} artigos ficaram sem pontuação após {max_rounds} rodadas.")
+        return scores
+
+    @staticmethod
+    def _build_batch_prompt(instruction, items):
+        listed_items = "\n".join(f"[{item_id}] {text}" for item_id, text in items)
+        return (
+            f"{instruction}\n"
+            "Responda apenas com um array JSON no formato "
+            '[{"id": <id>, "score": <número entre 0 e 1>}], com exatamente um objeto para cada id abaixo.\n'
+            f"{listed_items}"
         )
-        title_embedding = response_title['data'][0]['embedding']
 
-        response_abstract = openai.Embedding.create(
-            model="text-embedding-ada-002",
-            input=provided_abstract
-        )
-        abstract_embedding = response_abstract['data'][0]['embedding']
-
-        # Gerar embeddings para os artigos
-        print("Gerando embeddings para os artigos...")
-        article_embeddings = []
-        for title, snippet in zip(df['Título'], df['Snippet']):
-            response = openai.Embedding.create(
-                model="text-embedding-ada-002",
-                input=f"{title} {snippet}"
-            )
-            article_embeddings.append(response['data'][0]['embedding'])
+    @staticmethod
+    def _parse_batch_scores(response, expected_ids):
+        """
+        Extrai as pontuações válidas da resposta JSON, ignorando ids inesperados e valores não numéricos.
+        """
+        match = re.search(r'\[.*\]', response, re.DOTALL)
+        try:
+            items = json.loads(match.group(0)) if match else []
+        except json.JSONDecodeError:
+            return {}
+
+        expected_ids = set(expected_ids)
+        scores = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                item_id = int(item.get('id'))
+                score = float(item.get('score'))
+            except (TypeError, ValueError):
+                continue
+            if item_id in expected_ids and not np.isnan(score):
+                scores[item_id] = min(max(score, 0.0), 1.0)
+        return scores
+
+    def compare_title_and_abstract(self, provided_title, provided_abstract, df, top_k=None):
+        """
+        Compara o título e o resumo fornecidos com os artigos coletados usando embeddings.
+        Se `top_k` for informado, retorna apenas os k artigos mais similares.
+        """
+        if 'Título' not in df.columns or 'Snippet' not in df.columns:
+            raise ValueError("As colunas 'Título' ou 'Snippet' não foram encontradas no DataFrame.")
 
-        # Calcular similaridade entre o título e resumo fornecidos e os artigos
-        from sklearn.metrics.pairwise import cosine_similarity
-        title_similarities = cosine_similarity([title_embedding], article_embeddings)[0]
-        abstract_similarities = cosine_similarity([abstract_embedding], article_embeddings)[0]
+        # Gerar embeddings para o título, o resumo fornecido e os artigos em lotes,
+        # reaproveitando os vetores já armazenados em disco
+        print("Gerando embeddings para o título, o resumo fornecido e os artigos...")
+        article_texts = InvertedIndex.documents(df)
+        embeddings = self.embedding_manager.embed([provided_title, provided_abstract] + article_texts)
 
-        # Adicionar similaridades ao DataFrame
-        df['Similaridade com Título'] = title_similarities
-        df['Similaridade com Resumo'] = abstract_similarities
+        index = SimilarityIndex(embeddings[2:])
+        use_ann = bool(top_k and self.ann_index_path)
+        if use_ann:
+            index.load_or_build_ann(self.ann_index_path)
+        return self.rank_articles(df, index, embeddings[:2], top_k=top_k, use_ann=use_ann)
 
-        # Ordenar DataFrame por similaridade média
-        df['Similaridade Média'] = (df['Similaridade com Título'] + df['Similaridade com Resumo']) / 2
-        df_sorted = df.sort_values(by='Similaridade Média', ascending=False)
+    @staticmethod
+    def rank_articles(df, index, queries, top_k=None, use_ann=False):
+        """
+        Ordena as linhas de `df` (alinhadas com `index`) pela similaridade média com os embeddings
+        do título e do resumo em `queries`. Usado por compare_title_and_abstract e pelo RankingService,
+        que mantém o índice em memória entre as requisições.
+        """
+        # Calcular similaridade entre o título e resumo fornecidos e os artigos com uma única multiplicação de matrizes
+        queries = SimilarityIndex.normalize(queries)
+        if use_ann:
+            # A média dos dois cossenos equivale ao produto interno com a média das consultas normalizadas
+            order = index.search(queries.mean(axis=0), k=top_k, use_ann=True)[0][0]
+            similarities = queries @ index.matrix[order].T
+        else:
+            similarities = index.scores(queries)
+            order = index.top_k_indices(similarities.mean(axis=0), top_k or len(index))[0]
+            similarities = similarities[:, order]
+
+        # Retornar DataFrame ordenado por similaridade média
+        df_sorted = df.iloc[order].copy()
+        df_sorted['Similaridade com Título'] = similarities[0]
+        df_sorted['Similaridade com Resumo'] = similarities[1]
+        df_sorted['Similaridade Média'] = similarities.mean(axis=0)
+        return df_sorted
 
-        # Retornar DataFrame ordenado
+    def compare_with_pdfs(self, pdf_paths, df, top_k=None, rank_by="max", block_size=16384):
+        """
+        Compara os artigos com o texto completo de um ou mais PDFs. Cada PDF é dividido em trechos por seção
+        e cada artigo recebe a similaridade máxima e a média sobre todos os trechos, além da seção mais
+        próxima. `rank_by` ("max" ou "mean") define a ordenação; com `top_k`, retorna apenas os k primeiros.
+        """
+        if 'Título' not in df.columns or 'Snippet' not in df.columns:
+            raise ValueError("As colunas 'Título' ou 'Snippet' não foram encontradas no DataFrame.")
+        if rank_by not in ("max", "mean"):
+            raise ValueError(f"Ordenação desconhecida: {rank_by}. Use 'max' ou 'mean'.")
+
+        chunks = self.pdf_manager.chunk_pdfs(pdf_paths)
+        if chunks.empty:
+            raise ValueError("Nenhum trecho de texto foi extraído dos PDFs fornecidos.")
+
+        # Trechos e artigos vão juntos para o backend, em lotes, reaproveitando o cache em disco
+        print(f"Gerando embeddings para {len(chunks)} trechos dos PDFs e {len(df)} artigos...")
+        article_texts = InvertedIndex.documents(df)
+        matrix, rows = self.embedding_manager.embedding_rows(chunks['Texto'].tolist() + article_texts)
+        queries = SimilarityIndex.normalize(matrix[rows[:len(chunks)]])
+        article_rows = rows[len(chunks):]
+
+        # Todos os trechos contra um bloco de artigos por multiplicação de matrizes (trechos x artigos),
+        # com max/média/argmax por coluna; os blocos limitam a memória em corpora grandes
+        max_scores = np.empty(len(df), dtype=np.float32)
+        mean_scores = np.empty(len(df), dtype=np.float32)
+        best_chunks = np.empty(len(df), dtype=np.int64)
+        for start in range(0, len(df), block_size):
+            similarities = queries @ SimilarityIndex.normalize(matrix[article_rows[start:start + block_size]]).T
+            end = start + similarities.shape[1]
+            best_chunks[start:end] = similarities.argmax(axis=0)
+            max_scores[start:end] = similarities.max(axis=0)
+            mean_scores[start:end] = similarities.mean(axis=0)
+
+        scores = max_scores if rank_by == "max" else mean_scores
+        order = SimilarityIndex.top_k_indices(scores, top_k or len(df))[0]
+        df_sorted = df.iloc[order].copy()
+        df_sorted['Similaridade Máxima'] = max_scores[order]
+        df_sorted['Similaridade Média'] = mean_scores[order]
+        best = best_chunks[order]
+        df_sorted['Seção Mais Similar'] = chunks['Seção'].to_numpy()[best]
+        df_sorted['PDF Mais Similar'] = chunks['Arquivo'].to_numpy()[best]
         return df_sorted
+
+    def cluster_articles(self, df, method='OpenAI', output_file="clusters.png"):
+        """
+        Agrupa os artigos pelos embeddings de título + snippet e gera o gráfico de clusters.
+        Os embeddings são lidos direto do cache em disco; o DataFrame retornado recebe apenas
+        as colunas 'Cluster {method}', 'PCA_{method}_1' e 'PCA_{method}_2'.
+        """
+        article_texts = InvertedIndex.documents(df)
+        matrix, rows = self.embedding_manager.embedding_rows(article_texts)
+        df_clusters = self.cluster_manager.cluster_dataframe(df.copy(), matrix, rows, method=method)
+        self.visualization_manager.plot_clusters(df_clusters, method=method, output_file=output_file)
+        return df_clusters
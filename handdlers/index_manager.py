@@ -0,0 +1,243 @@
+import os
+import re
+import hashlib
+from itertools import chain
+import numpy as np
+import pandas as pd
+from handdlers.query_parser import parse_query_groups
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+class InvertedIndex:
+    """
+    Índice invertido em memória sobre título + snippet dos artigos coletados.
+    As listas de postings ficam em arrays (formato CSR: offsets, ids de documentos e frequências)
+    e os documentos novos são acumulados em um buffer, incorporado aos arrays na próxima consulta.
+    O id de cada documento é a sua posição no arquivo de artigos (mesma ordem do DataFrame coletado).
+    A impressão digital encadeia o hash de cada texto indexado, para detectar um corpus diferente ao carregar.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}
+        self._terms = []
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._doc_ids = np.empty(0, dtype=np.int32)
+        self._tfs = np.empty(0, dtype=np.uint16)
+        self._doc_lengths = np.empty(0, dtype=np.float32)
+        self._pending = []
+        self._sorted_terms = None
+        self.fingerprint = ""
+
+    def __len__(self):
+        return len(self._doc_lengths) + len(self._pending)
+
+    def add_document(self, text):
+        """
+        Acrescenta um documento ao índice e retorna o seu id.
+        """
+        self._pending.append(tokenize(text))
+        self.fingerprint = self.chain_fingerprint([text], self.fingerprint)
+        return len(self) - 1
+
+    @staticmethod
+    def chain_fingerprint(texts, fingerprint=""):
+        """
+        Hash encadeado dos textos, na ordem: o de um prefixo do corpus pode ser estendido documento a documento.
+        """
+        for text in texts:
+            fingerprint = hashlib.sha1(f"{fingerprint}\0{text}".encode("utf-8")).hexdigest()
+        return fingerprint
+
+    def add_documents(self, texts):
+        for text in texts:
+            self.add_document(text)
+
+    def _merge_pending(self):
+        """
+        Incorpora os documentos pendentes aos arrays de postings, reconstruindo o CSR uma única vez.
+        """
+        if not self._pending:
+            return
+        first_doc = len(self._doc_lengths)
+        lengths = np.array([len(tokens) for tokens in self._pending], dtype=np.int64)
+        tokens = list(chain.from_iterable(self._pending))
+
+        # Converte os tokens em ids de termos (novos termos entram no fim do vocabulário)
+        codes, uniques = pd.factorize(pd.Series(tokens, dtype=object))
+        for token in uniques:
+            if token not in self.vocabulary:
+                self.vocabulary[token] = len(self._terms)
+                self._terms.append(token)
+        unique_ids = np.array([self.vocabulary[token] for token in uniques], dtype=np.int64)
+
+        # Frequência de cada par (termo, documento) novo
+        doc_of_token = np.repeat(np.arange(first_doc, first_doc + len(lengths), dtype=np.int64), lengths)
+        pairs, tfs = np.unique(unique_ids[codes] * (first_doc + len(lengths)) + doc_of_token, return_counts=True)
+        term_ids, doc_ids = np.divmod(pairs, first_doc + len(lengths))
+        tfs = np.minimum(tfs, np.iinfo(np.uint16).max)
+        self._pending = []
+        self._sorted_terms = None
+
+        # Junta as postings antigas (expandidas por termo) com as novas e reordena por (termo, documento)
+        old_term_ids = np.repeat(np.arange(len(self._offsets) - 1, dtype=np.int64), np.diff(self._offsets))
+        all_terms = np.concatenate([old_term_ids, term_ids])
+        all_docs = np.concatenate([self._doc_ids, doc_ids.astype(np.int32)])
+        all_tfs = np.concatenate([self._tfs, tfs.astype(np.uint16)])
+        order = np.lexsort((all_docs, all_terms))
+
+        self._doc_ids = all_docs[order]
+        self._tfs = all_tfs[order]
+        counts = np.bincount(all_terms, minlength=len(self._terms))
+        self._offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self._doc_lengths = np.concatenate([self._doc_lengths, lengths.astype(np.float32)])
+
+    def postings(self, term):
+        """
+        Retorna (ids de documentos, frequências) de um termo exato.
+        """
+        self._merge_pending()
+        term_id = self.vocabulary.get(term)
+        if term_id is None:
+            return self._doc_ids[:0], self._tfs[:0]
+        start, end = self._offsets[term_id], self._offsets[term_id + 1]
+        return self._doc_ids[start:end], self._tfs[start:end]
+
+    def terms_with_prefix(self, prefix):
+        """
+        Termos do vocabulário que começam com o prefixo (equivalente à busca por substring no início da palavra).
+        """
+        self._merge_pending()
+        if self._sorted_terms is None:
+            self._sorted_terms = np.array(sorted(self._terms), dtype=object)
+        start = np.searchsorted(self._sorted_terms, prefix, side="left")
+        end = np.searchsorted(self._sorted_terms, prefix + "\uffff", side="left")
+        return list(self._sorted_terms[start:end])
+
+    def match_term(self, term, prefix=False):
+        """
+        Máscara booleana dos documentos que contêm todos os tokens do termo
+        (um termo com várias palavras, como "attention mechanism", exige todas elas).
+        """
+        self._merge_pending()
+        mask = np.ones(len(self), dtype=bool)
+        tokens = tokenize(term)
+        if not tokens:
+            return np.zeros(len(self), dtype=bool)
+        for token in tokens:
+            token_mask = np.zeros(len(self), dtype=bool)
+            for variant in (self.terms_with_prefix(token) if prefix else [token]):
+                token_mask[self.postings(variant)[0]] = True
+            mask &= token_mask
+        return mask
+
+    def match_group(self, terms, prefix=False):
+        """
+        Máscara dos documentos que contêm pelo menos um dos termos (OR).
+        """
+        mask = np.zeros(len(self), dtype=bool)
+        for term in terms:
+            mask |= self.match_term(term, prefix=prefix)
+        return mask
+
+    def match_query(self, query, prefix=False):
+        """
+        Máscara dos documentos que satisfazem uma query booleana no formato do Google Scholar:
+        grupos OR entre parênteses combinados por AND.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for group in parse_query_groups(query):
+            mask &= self.match_group(group, prefix=prefix)
+        return mask
+
+    def bm25(self, query):
+        """
+        Pontuação BM25 de todos os documentos para os tokens da query (operadores são ignorados).
+        """
+        self._merge_pending()
+        scores = np.zeros(len(self), dtype=np.float32)
+        if not len(self):
+            return scores
+        tokens = {token for token in tokenize(re.sub(r'\b(AND|OR)\b', ' ', query)) if token in self.vocabulary}
+        avg_length = max(self._doc_lengths.mean(), 1.0)
+        length_norm = self.k1 * (1 - self.b + self.b * self._doc_lengths / avg_length)
+        for token in tokens:
+            doc_ids, tfs = self.postings(token)
+            idf = np.log(1 + (len(self) - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            tfs = tfs.astype(np.float32)
+            np.add.at(scores, doc_ids, idf * tfs * (self.k1 + 1) / (tfs + length_norm[doc_ids]))
+        return scores
+
+    def search(self, query, k=None, prefix=False):
+        """
+        Retorna (ids, pontuações) dos documentos que satisfazem a query booleana, ordenados por BM25.
+        """
+        matches = np.flatnonzero(self.match_query(query, prefix=prefix))
+        scores = self.bm25(query)[matches]
+        order = np.argsort(-scores, kind="stable")
+        if k is not None:
+            order = order[:k]
+        return matches[order], scores[order]
+
+    def save(self, path):
+        self._merge_pending()
+        # Grava em um arquivo temporário e troca de uma vez, para nunca deixar um índice pela metade
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez(
+                f,
+                terms=np.array(self._terms, dtype=str),
+                offsets=self._offsets,
+                doc_ids=self._doc_ids,
+                tfs=self._tfs,
+                doc_lengths=self._doc_lengths,
+                params=np.array([self.k1, self.b]),
+                fingerprint=np.array(self.fingerprint),
+            )
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            k1, b = data["params"]
+            index = cls(k1=float(k1), b=float(b))
+            index._terms = data["terms"].tolist()
+            index.vocabulary = {term: i for i, term in enumerate(index._terms)}
+            index._offsets = data["offsets"]
+            index._doc_ids = data["doc_ids"]
+            index._tfs = data["tfs"]
+            index._doc_lengths = data["doc_lengths"]
+            # Índices salvos sem impressão digital não podem ser validados e são reconstruídos
+            index.fingerprint = str(data["fingerprint"]) if "fingerprint" in data.files else None
+        return index
+
+    @staticmethod
+    def documents(df):
+        """
+        Texto de cada artigo do DataFrame: título + snippet, com valores ausentes vazios.
+        É o mesmo texto indexado e enviado aos embeddings, para que os dois não divirjam.
+        """
+        return (df['Título'].fillna('').astype(str) + ' ' + df['Snippet'].fillna('').astype(str)).tolist()
+
+    @classmethod
+    def load_or_build(cls, path, texts):
+        """
+        Carrega o índice salvo e acrescenta apenas os documentos novos (o arquivo de artigos só cresce por append).
+        Se os documentos já indexados não forem o início do corpus atual (impressão digital diferente),
+        o índice é reconstruído.
+        """
+        index = cls.load(path) if os.path.exists(path) else cls()
+        if len(index) > len(texts) or index.fingerprint != cls.chain_fingerprint(texts[:len(index)]):
+            if len(index):
+                print("O índice invertido salvo não corresponde ao corpus atual. Reconstruindo...")
+            index = cls()
+        if len(index) < len(texts):
+            print(f"Indexando {len(texts) - len(index)} artigos novos no índice invertido...")
+            index.add_documents(texts[len(index):])
+            index.save(path)
+        return index
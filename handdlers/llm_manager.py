@@ -0,0 +1,173 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from handdlers.rate_limiter import RateLimiter
+from handdlers.cache_manager import CacheMissError
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMManager:
+    """
+    Executa chamadas à API da OpenAI em paralelo, com limite de concorrência,
+    token bucket por minuto e novas tentativas com backoff exponencial e jitter.
+    Se um cache de respostas for informado, apenas as requisições ausentes vão para a API.
+    O pacote openai só é importado na primeira requisição.
+    """
+
+    def __init__(self, max_workers=8, requests_per_minute=500, tokens_per_minute=200000,
+                 max_retries=5, backoff_base=1.0, backoff_max=60.0, api_base=None, cache=None, metrics=None,
+                 api_key=None):
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Permite apontar para um servidor local compatível com a API da OpenAI
+        self.api_base = api_base
+        # Chave enviada em cada requisição (sem ela, vale openai.api_key / OPENAI_API_KEY)
+        self.api_key = api_key
+        self.cache = cache
+        # MetricsManager opcional: latência, chamadas, novas tentativas e tokens de cada tipo de requisição
+        self.metrics = metrics
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+
+    def map(self, fn, items, token_estimates=None):
+        """
+        Aplica `fn` a cada item em paralelo e retorna os resultados na ordem de entrada.
+        """
+        items = list(items)
+        if token_estimates is None:
+            token_estimates = [1] * len(items)
+        if not items:
+            return []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self._call_with_retry, fn, item, tokens)
+                for item, tokens in zip(items, token_estimates)
+            ]
+            return [future.result() for future in futures]
+
+    def chat_completions(self, requests):
+        """
+        Envia uma lista de requisições de chat (dicionários com model, messages, max_tokens...)
+        e retorna o texto de cada resposta, na mesma ordem.
+        """
+        requests = list(requests)
+        results = [None] * len(requests)
+        pending = []
+        for i, request in enumerate(requests):
+            cached = self.cache.get(request) if self.cache else None
+            if cached is None:
+                pending.append(i)
+            else:
+                results[i] = cached
+        if self.cache:
+            # Os acessos das respostas encontradas são gravados de uma vez
+            self.cache.flush()
+
+        if self.cache and self.metrics:
+            self.metrics.increment("cache.acertos", len(requests) - len(pending))
+            self.metrics.increment("cache.falhas", len(pending))
+
+        if pending and self.cache and self.cache.offline:
+            raise CacheMissError(
+                f"{len(pending)} requisições não estão no cache e o modo offline está ativo."
+            )
+
+        pending_requests = [requests[i] for i in pending]
+        token_estimates = [self.estimate_tokens(request) for request in pending_requests]
+        for i, content in zip(pending, self.map(self._create_chat_completion, pending_requests, token_estimates)):
+            results[i] = content
+        return results
+
+    def request_options(self):
+        """
+        Parâmetros de conexão repassados a cada chamada do pacote openai.
+        """
+        options = {}
+        if self.api_base:
+            options["api_base"] = self.api_base
+        if self.api_key:
+            options["api_key"] = self.api_key
+        return options
+
+    def _create_chat_completion(self, request):
+        import openai
+
+        kwargs = {**self.request_options(), **request}
+        response = openai.ChatCompletion.create(**kwargs)
+        self.record_usage(response, "chat")
+        content = response['choices'][0]['message']['content'].strip()
+        if self.cache:
+            # Grava cada resposta assim que chega, para que uma interrupção não perca o trabalho já pago
+            self.cache.set(request, content)
+        return content
+
+    def _call_with_retry(self, fn, item, tokens):
+        name = getattr(fn, '__name__', 'chamada').strip('_')
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            self.rate_limiter.acquire(tokens)
+            if self.metrics:
+                self.metrics.observe("api.espera_limite_s", time.perf_counter() - start)
+            start = time.perf_counter()
+            try:
+                result = fn(item)
+                self._record_call(name, start, "chamadas")
+                return result
+            except Exception as e:
+                self._record_call(name, start, "erros")
+                if attempt >= self.max_retries or not self.is_retryable(e):
+                    raise
+                if self.metrics:
+                    self.metrics.increment(f"api.{name}.retentativas")
+                delay = self._retry_after(e)
+                if delay is None:
+                    # Full jitter: espera aleatória entre 0 e o teto exponencial
+                    delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                print(f"Erro temporário na API ({e}). Nova tentativa em {delay:.1f}s...")
+                time.sleep(delay)
+                attempt += 1
+
+    def _record_call(self, name, start, outcome):
+        if self.metrics:
+            self.metrics.observe(f"api.{name}.latencia_s", time.perf_counter() - start)
+            self.metrics.increment(f"api.{name}.{outcome}")
+
+    def record_usage(self, response, kind):
+        """
+        Soma os tokens informados pela API (campo `usage` da resposta) nas métricas.
+        """
+        if self.metrics:
+            for field, value in (response.get('usage') or {}).items():
+                self.metrics.increment(f"tokens.{kind}.{field}", value)
+
+    @staticmethod
+    def is_retryable(error):
+        """
+        Indica se o erro corresponde a um 429/5xx ou a uma falha de conexão temporária.
+        """
+        import openai
+
+        if isinstance(error, (openai.error.RateLimitError, openai.error.ServiceUnavailableError,
+                              openai.error.Timeout, openai.error.TryAgain, openai.error.APIConnectionError)):
+            return True
+        return getattr(error, 'http_status', None) in RETRYABLE_STATUS
+
+    @staticmethod
+    def _retry_after(error):
+        headers = getattr(error, 'headers', None) or {}
+        try:
+            return float(headers.get('retry-after') or headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def estimate_tokens(request):
+        """
+        Estimativa grosseira (4 caracteres por token) usada pelo limitador de tokens por minuto.
+        """
+        prompt_chars = sum(len(str(message.get('content', ''))) for message in request.get('messages', []))
+        return prompt_chars // 4 + request.get('max_tokens', 0)
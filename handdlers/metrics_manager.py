@@ -0,0 +1,129 @@
+import os
+import io
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+import numpy as np
+
+
+class MetricsManager:
+    """
+    Coleta métricas de uma execução do funil: tempo de cada etapa, contadores (chamadas à API,
+    tokens, novas tentativas, acertos de cache...) e histogramas (latência de cada requisição).
+    É seguro para uso pelas threads do LLMManager e do SearchManager.
+    Uma etapa pode ser perfilada com cProfile e, opcionalmente, tracemalloc.
+    """
+
+    def __init__(self, profile_stage=None, profile_dir="perfis", trace_memory=False):
+        self.profile_stage = profile_stage
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.counters = {}
+        self.histograms = {}
+        self.profiles = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        with self._lock:
+            self.histograms.setdefault(name, []).append(value)
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Registra a duração do bloco (em segundos) no histograma `name`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Mede uma etapa do funil. Se `name` for a etapa configurada em `profile_stage`,
+        ela também é executada sob cProfile (e tracemalloc, se `trace_memory`).
+        """
+        entry = {"etapa": name}
+        profiler = None
+        if name == self.profile_stage:
+            profiler = cProfile.Profile()
+            if self.trace_memory:
+                tracemalloc.start()
+            profiler.enable()
+
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            entry["tempo_s"] = round(time.perf_counter() - start, 4)
+            if profiler is not None:
+                profiler.disable()
+                self._save_profile(name, profiler)
+            with self._lock:
+                self.stages.append(entry)
+
+    def _save_profile(self, name, profiler):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"{name}.prof")
+        profiler.dump_stats(path)
+
+        # Resumo legível com as 30 funções de maior tempo acumulado
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(30)
+        with open(os.path.join(self.profile_dir, f"{name}.txt"), "w", encoding="utf-8") as f:
+            f.write(summary.getvalue())
+
+        profile = {"cprofile": path}
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            profile["memoria_atual_mb"] = round(current / 2 ** 20, 2)
+            profile["memoria_pico_mb"] = round(peak / 2 ** 20, 2)
+        self.profiles[name] = profile
+        print(f"Perfil da etapa '{name}' salvo em {path}.")
+
+    @staticmethod
+    def summarize(values):
+        values = np.asarray(values, dtype=np.float64)
+        return {
+            "quantidade": int(len(values)),
+            "total": round(float(values.sum()), 4),
+            "media": round(float(values.mean()), 4),
+            "p50": round(float(np.percentile(values, 50)), 4),
+            "p95": round(float(np.percentile(values, 95)), 4),
+            "max": round(float(values.max()), 4),
+        }
+
+    def report(self, extra=None):
+        with self._lock:
+            report = {
+                "tempo_total_s": round(time.perf_counter() - self._started, 4),
+                "etapas": list(self.stages),
+                "contadores": dict(sorted(self.counters.items())),
+                "histogramas": {name: self.summarize(values) for name, values in sorted(self.histograms.items())},
+            }
+            if self.profiles:
+                report["perfis"] = dict(self.profiles)
+        report.update(extra or {})
+        return report
+
+    def save(self, path, extra=None):
+        """
+        Grava o relatório da execução em JSON.
+        """
+        report = self.report(extra)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        print(f"Relatório de métricas salvo em {path}.")
+        return report
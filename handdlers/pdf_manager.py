@@ -0,0 +1,168 @@
+import os
+import re
+import hashlib
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+# Títulos de seção reconhecidos sem numeração (artigos em inglês e em português)
+SECTION_NAMES = [
+    "abstract", "resumo", "introduction", "introdução", "background", "related work", "trabalhos relacionados",
+    "preliminaries", "preliminares", "method", "methods", "methodology", "metodologia", "proposed method",
+    "experiments", "experimental results", "experimentos", "results", "resultados", "discussion", "discussão",
+    "conclusion", "conclusions", "conclusão", "conclusões", "considerações finais", "future work",
+    "acknowledgments", "acknowledgements", "agradecimentos", "references", "referências", "bibliography",
+]
+# A partir destas seções o texto não descreve mais o trabalho e é descartado
+STOP_SECTIONS = {"references", "referências", "bibliography", "acknowledgments", "acknowledgements", "agradecimentos"}
+
+_NUMBERED_HEADING = r"(?:\d+(?:\.\d+)*\.?|[IVX]+\.)\s+[A-ZÀ-Ú][^\n.]{2,80}"
+# Só os nomes conhecidos ignoram maiúsculas: um título numerado precisa começar com maiúscula, para que
+# linhas do corpo que começam com um número ("2 layers of the encoder...") não virem seções
+_NAMED_HEADING = r"(?i:(?:\d+(?:\.\d+)*\.?\s+)?(?:" + "|".join(re.escape(name) for name in SECTION_NAMES) + r")\s*:?)"
+# Um título de seção ocupa uma linha inteira
+HEADING_PATTERN = re.compile(rf"^[ \t]*({_NAMED_HEADING}|{_NUMBERED_HEADING})[ \t]*$", re.MULTILINE)
+
+
+def _extract_pdf_text(path):
+    from PyPDF2 import PdfReader
+
+    # Executado nos processos do pool: cada página é extraída independentemente
+    reader = PdfReader(path)
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+class PdfManager:
+    """
+    Extrai o texto de um ou mais PDFs em um pool de processos e guarda a extração em disco,
+    indexada pelo hash do conteúdo do arquivo (renomear ou mover o PDF não refaz a extração).
+    O texto é dividido em trechos por seção, prontos para gerar embeddings em lote.
+    """
+
+    def __init__(self, cache_dir="cache_pdfs", max_workers=None, max_chunk_chars=2000, min_chunk_chars=200,
+                 metrics=None):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        # Seções maiores que max_chunk_chars são divididas por parágrafos; trechos menores que
+        # min_chunk_chars são unidos ao anterior da mesma seção
+        self.max_chunk_chars = max_chunk_chars
+        self.min_chunk_chars = min_chunk_chars
+        # MetricsManager opcional: tempo de extração e acertos do cache
+        self.metrics = metrics
+
+    @staticmethod
+    def file_hash(path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _cache_path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.txt")
+
+    def _timer(self, name):
+        return self.metrics.timer(name) if self.metrics else nullcontext()
+
+    @staticmethod
+    def _as_paths(paths):
+        # Aceita um único caminho ou qualquer iterável de caminhos, sem repetições
+        if isinstance(paths, (str, os.PathLike)):
+            paths = [paths]
+        return list(dict.fromkeys(paths))
+
+    def extract_texts(self, paths):
+        """
+        Retorna {caminho: texto} para cada PDF. Apenas os arquivos ainda não extraídos vão para o pool.
+        """
+        paths = self._as_paths(paths)
+        hashes = {path: self.file_hash(path) for path in paths}
+        texts = {}
+        missing = []
+        for path, digest in hashes.items():
+            cache_path = self._cache_path(digest)
+            if os.path.exists(cache_path):
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    texts[path] = f.read()
+            else:
+                missing.append(path)
+
+        if self.metrics:
+            self.metrics.increment("pdf.cache_acertos", len(paths) - len(missing))
+            self.metrics.increment("pdf.cache_falhas", len(missing))
+
+        if missing:
+            print(f"Extraindo o texto de {len(missing)} PDFs ({len(paths) - len(missing)} já estavam no cache)...")
+            with self._timer("pdf.extracao_s"):
+                if len(missing) == 1:
+                    extracted = [_extract_pdf_text(missing[0])]
+                else:
+                    with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                        extracted = list(executor.map(_extract_pdf_text, missing))
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for path, text in zip(missing, extracted):
+                cache_path = self._cache_path(hashes[path])
+                with open(cache_path + ".tmp", "w", encoding="utf-8") as f:
+                    f.write(text)
+                os.replace(cache_path + ".tmp", cache_path)
+                texts[path] = text
+        return {path: texts[path] for path in paths}
+
+    def split_sections(self, text):
+        """
+        Divide o texto em [(seção, trecho)]. O texto antes do primeiro título de seção fica em 'Título';
+        referências e agradecimentos são descartados.
+        """
+        text = re.sub(r"-\n(?=[a-zà-ú])", "", text.replace("\r", ""))
+        headings = list(HEADING_PATTERN.finditer(text))
+        bounds = [("Título", 0)] + [(m.group(1).strip().rstrip(":"), m.end()) for m in headings]
+        ends = [m.start() for m in headings] + [len(text)]
+
+        chunks = []
+        for (section, start), end in zip(bounds, ends):
+            name = re.sub(r"^[\dIVX.]+\s+", "", section).lower()
+            if name in STOP_SECTIONS:
+                break
+            for chunk in self._split_paragraphs(text[start:end]):
+                chunks.append((section, chunk))
+        return chunks
+
+    def _split_paragraphs(self, section_text):
+        paragraphs = [re.sub(r"\s+", " ", p).strip() for p in re.split(r"\n\s*\n|(?<=[.:])\n", section_text)]
+        chunks = []
+        current = ""
+        for paragraph in filter(None, paragraphs):
+            # Parágrafos muito longos são cortados em pedaços de max_chunk_chars
+            while len(paragraph) > self.max_chunk_chars:
+                cut = paragraph.rfind(" ", 0, self.max_chunk_chars)
+                cut = cut if cut > 0 else self.max_chunk_chars
+                if current:
+                    chunks.append(current)
+                    current = ""
+                chunks.append(paragraph[:cut].strip())
+                paragraph = paragraph[cut:].strip()
+            if current and len(current) + len(paragraph) + 1 > self.max_chunk_chars:
+                chunks.append(current)
+                current = paragraph
+            else:
+                current = f"{current} {paragraph}".strip()
+        if current:
+            if chunks and len(current) < self.min_chunk_chars:
+                chunks[-1] = f"{chunks[-1]} {current}"
+            else:
+                chunks.append(current)
+        return chunks
+
+    def chunk_pdfs(self, paths):
+        """
+        Retorna um DataFrame com uma linha por trecho: 'Arquivo', 'Seção' e 'Texto'.
+        """
+        paths = self._as_paths(paths)
+        rows = []
+        for path, text in self.extract_texts(paths).items():
+            sections = self.split_sections(text)
+            if not sections:
+                print(f"Nenhum texto extraído de {path}; o PDF pode conter apenas imagens.")
+            rows.extend((os.path.basename(path), section, chunk) for section, chunk in sections)
+        print(f"{len(rows)} trechos extraídos de {len(paths)} PDFs.")
+        return pd.DataFrame(rows, columns=['Arquivo', 'Seção', 'Texto'])
@@ -0,0 +1,17 @@
+import re
+
+
+def parse_query_groups(query):
+    """
+    Converte uma query no formato do Google Scholar, como "(a OR b) AND (c OR d)",
+    em uma lista de grupos de termos: [["a", "b"], ["c", "d"]].
+    Cada grupo representa uma disjunção (OR) e os grupos são combinados por conjunção (AND).
+    """
+    groups = []
+    for part in re.split(r'\s+AND\s+', query.strip()):
+        part = part.strip().strip('()').strip()
+        terms = [term.strip().strip('"').strip() for term in re.split(r'\s+OR\s+', part)]
+        terms = [term for term in terms if term]
+        if terms:
+            groups.append(terms)
+    return groups
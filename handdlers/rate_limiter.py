@@ -0,0 +1,56 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket compartilhado entre threads que limita requisições e tokens por minuto.
+    Um limite igual a None desativa o respectivo balde.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_tokens = float(requests_per_minute or 0)
+        self._token_tokens = float(tokens_per_minute or 0)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.requests_per_minute:
+            self._request_tokens = min(
+                float(self.requests_per_minute),
+                self._request_tokens + elapsed * self.requests_per_minute / 60.0
+            )
+        if self.tokens_per_minute:
+            self._token_tokens = min(
+                float(self.tokens_per_minute),
+                self._token_tokens + elapsed * self.tokens_per_minute / 60.0
+            )
+
+    def acquire(self, tokens=1):
+        """
+        Bloqueia até que haja capacidade para uma requisição com o número de tokens informado.
+        """
+        if self.tokens_per_minute:
+            # Uma requisição maior que o balde inteiro nunca seria liberada
+            tokens = min(tokens, self.tokens_per_minute)
+
+        while True:
+            with self._lock:
+                self._refill()
+                wait = 0.0
+                if self.requests_per_minute and self._request_tokens < 1:
+                    wait = max(wait, (1 - self._request_tokens) * 60.0 / self.requests_per_minute)
+                if self.tokens_per_minute and self._token_tokens < tokens:
+                    wait = max(wait, (tokens - self._token_tokens) * 60.0 / self.tokens_per_minute)
+                if wait == 0.0:
+                    if self.requests_per_minute:
+                        self._request_tokens -= 1
+                    if self.tokens_per_minute:
+                        self._token_tokens -= tokens
+                    return
+            time.sleep(wait)
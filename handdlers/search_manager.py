@@ -1,95 +1,394 @@
 import os
+import re
 import json
 import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 from dotenv import load_dotenv
-from scholarly import scholarly, MaxTriesExceededException
+from handdlers.rate_limiter import RateLimiter
+from handdlers.query_parser import parse_query_groups
+from handdlers.index_manager import InvertedIndex
 
 class SearchManager:
-    def __init__(self, query, num_results=100, delay=20):
+    def __init__(self, query, num_results=100, delay=20, fsync_every=10,
+                 sub_queries=None, expand_query=False, sessions=None, requests_per_minute=None,
+                 parquet_snapshot=False, metrics=None):
         load_dotenv()
         self.query = query
         self.num_results = num_results
         self.delay = delay
+        # Número de artigos gravados entre duas chamadas a fsync
+        self.fsync_every = fsync_every
+        # Subconsultas executadas em paralelo: explícitas ou geradas a partir dos grupos OR da query
+        self.sub_queries = list(sub_queries) if sub_queries else None
+        self.expand_query = expand_query
+        # Uma "sessão" por worker: qualquer objeto com search_pubs (por exemplo, scholarly com proxy próprio).
+        # Sem sessões, o módulo scholarly é usado, importado apenas quando uma busca é de fato executada
+        self.sessions = list(sessions) if sessions else []
+        # Limite global compartilhado por todos os workers, além do `delay` de cada sessão
+        self.rate_limiter = RateLimiter(requests_per_minute=requests_per_minute)
+        self.parquet_snapshot = parquet_snapshot
+        # MetricsManager opcional: artigos coletados, duplicados e latência de cada resultado
+        self.metrics = metrics
+        # Índice invertido (BM25) do corpus, salvo ao lado do arquivo de artigos
+        self.index = None
 
-    def collect_articles(self, output_file="artigos_google_scholar.json"):
+    def collect_articles(self, output_file="artigos_google_scholar.jsonl"):
         """
-        Coleta artigos utilizando o Scholarly e salva em um arquivo JSON.
+        Coleta artigos utilizando o Scholarly e os grava em um arquivo JSONL, um artigo por linha,
+        à medida que chegam. Uma coleta interrompida é retomada a partir do último `gsrank` salvo.
+        Arquivos JSON antigos (uma lista única) continuam sendo carregados normalmente.
         """
-        if os.path.exists(output_file):
-            print(f"O arquivo {output_file} já existe. Carregando resultados do arquivo.")
-            all_results = self._load_from_file(output_file)
+        input_file = self.resolve_input_file(output_file)
+        if self.is_complete(output_file):
+            print(f"O arquivo {input_file} já existe. Carregando resultados do arquivo.")
+            df = self._load_dataframe(input_file)
         else:
-            print("Arquivo não encontrado. Iniciando nova busca...")
-            all_results = self._search_articles(output_file)
+            if os.path.exists(output_file):
+                print(f"Coleta incompleta encontrada em {output_file}. Retomando a busca...")
+            else:
+                print("Arquivo não encontrado. Iniciando nova busca...")
+            df = self._process_articles_to_dataframe(self._search_articles(output_file) or [])
 
-        if not all_results:
+        if df is None or df.empty:
             raise ValueError("Nenhum resultado encontrado. Verifique a coleta de artigos ou o arquivo de entrada.")
-        articles_list = self._process_articles_to_dataframe(all_results)
-        return pd.DataFrame(articles_list)
+        self.load_index(output_file, df)
+        return df
+
+    @staticmethod
+    def index_file(output_file):
+        return f"{output_file}.indice.npz"
+
+    def load_index(self, output_file, df):
+        """
+        Carrega o índice invertido salvo ao lado do arquivo de artigos, indexando apenas os artigos
+        que ainda não estão nele. Os ids do índice são as posições das linhas de `df`.
+        """
+        texts = InvertedIndex.documents(df)
+        if self.index is None or self.index.fingerprint != InvertedIndex.chain_fingerprint(texts):
+            self.index = InvertedIndex.load_or_build(self.index_file(output_file), texts)
+        return self.index
+
+    @staticmethod
+    def resolve_input_file(output_file):
+        """
+        Retorna o arquivo de onde os artigos serão lidos: o JSONL informado ou, se ele ainda não existir,
+        o arquivo JSON antigo com o mesmo nome base.
+        """
+        legacy_file = os.path.splitext(output_file)[0] + ".json"
+        if not os.path.exists(output_file) and output_file.endswith(".jsonl") and os.path.exists(legacy_file):
+            return legacy_file
+        return output_file
+
+    @staticmethod
+    def _completion_marker(output_file):
+        return f"{output_file}.completo"
+
+    def is_complete(self, output_file):
+        """
+        Indica se a coleta em `output_file` terminou: o marcador `.completo` existe ou os artigos
+        vêm de um arquivo JSON antigo, que nunca é retomado.
+        """
+        input_file = self.resolve_input_file(output_file)
+        if input_file != output_file:
+            return os.path.exists(input_file)
+        return os.path.exists(output_file) and os.path.exists(self._completion_marker(output_file))
+
+    def _load_dataframe(self, file_path):
+        """
+        Carrega os artigos diretamente em colunas, lendo o JSONL linha a linha sem manter os registros completos.
+        Com `parquet_snapshot`, grava um snapshot Parquet ao lado do arquivo e o reutiliza enquanto estiver atualizado.
+        """
+        snapshot_file = f"{file_path}.parquet"
+        if self.parquet_snapshot and os.path.exists(snapshot_file) \
+                and os.path.getmtime(snapshot_file) >= os.path.getmtime(file_path):
+            return pd.read_parquet(snapshot_file)
+
+        try:
+            legacy = self._is_legacy_json(file_path)
+            with open(file_path, "r", encoding="utf-8") as f:
+                # O formato JSON antigo é uma lista única e precisa ser carregado de uma vez
+                records = json.load(f) if legacy else self._iter_jsonl(f)
+                df = self._process_articles_to_dataframe(records)
+        except Exception as e:
+            print(f"Erro ao carregar o arquivo {file_path}: {e}")
+            return None
+
+        if self.parquet_snapshot:
+            try:
+                df.to_parquet(snapshot_file)
+            except ImportError:
+                print("Aviso: pyarrow não está instalado; o snapshot Parquet não foi gravado.")
+        return df
 
     def _load_from_file(self, file_path):
         """
-        Carrega os artigos de um arquivo JSON salvo anteriormente.
+        Carrega os artigos de um arquivo JSONL (um artigo por linha) ou de um arquivo JSON antigo (lista única).
         """
         try:
+            legacy = self._is_legacy_json(file_path)
             with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+                if legacy:
+                    return json.load(f)
+                return list(self._iter_jsonl(f))
         except Exception as e:
             print(f"Erro ao carregar o arquivo {file_path}: {e}")
             return None
 
+    def load_articles(self, file_path, start=0):
+        """
+        Lê os artigos já coletados, sem buscar, e retorna (DataFrame, posição). No JSONL são lidas apenas
+        as linhas completas a partir do byte `start` (a última pode estar sendo gravada), e a posição
+        retornada é onde a próxima leitura deve começar. O JSON antigo é sempre lido inteiro.
+        """
+        if self._is_legacy_json(file_path):
+            return self._load_dataframe(file_path), os.path.getsize(file_path)
+        end = self._complete_lines_end(file_path)
+        if end <= start:
+            return self._process_articles_to_dataframe([]), start
+        with open(file_path, "rb") as f:
+            f.seek(start)
+            lines = f.read(end - start).decode("utf-8").splitlines()
+        return self._process_articles_to_dataframe(self._iter_jsonl(lines)), end
+
+    @staticmethod
+    def _is_legacy_json(file_path):
+        # O formato antigo é uma lista JSON única; o atual tem um objeto por linha
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(4096), b""):
+                block = block.lstrip()
+                if block:
+                    return block.startswith(b"[")
+        return False
+
+    @staticmethod
+    def _complete_lines_end(file_path):
+        # Posição logo após o último \n do arquivo
+        with open(file_path, "rb") as f:
+            position = f.seek(0, os.SEEK_END)
+            while position > 0:
+                step = min(1 << 16, position)
+                f.seek(position - step)
+                newline = f.read(step).rfind(b"\n")
+                if newline >= 0:
+                    return position - step + newline + 1
+                position -= step
+        return 0
+
+    @staticmethod
+    def _iter_jsonl(f):
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Uma interrupção durante a escrita pode deixar a última linha incompleta
+                print("Aviso: linha incompleta ignorada no arquivo de artigos.")
+
+    @staticmethod
+    def _ends_without_newline(file_path):
+        if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+            return False
+        with open(file_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def build_sub_queries(self):
+        """
+        Retorna as subconsultas da busca. Com `expand_query`, o maior grupo OR da query é dividido:
+        "(a OR b) AND (c OR d)" vira "(a) AND (c OR d)" e "(b) AND (c OR d)", cuja união equivale à query original.
+        """
+        if self.sub_queries:
+            return self.sub_queries
+        if not self.expand_query:
+            return [self.query]
+
+        groups = parse_query_groups(self.query)
+        if not groups:
+            return [self.query]
+        split_index = max(range(len(groups)), key=lambda i: len(groups[i]))
+        sub_queries = []
+        for term in groups[split_index]:
+            parts = [
+                f"({term})" if i == split_index else f"({' OR '.join(group)})"
+                for i, group in enumerate(groups)
+            ]
+            sub_queries.append(" AND ".join(parts))
+        return sub_queries
+
+    @staticmethod
+    def _dedup_keys(article):
+        """
+        Chaves usadas para identificar o mesmo artigo vindo de subconsultas diferentes.
+        """
+        keys = []
+        title = re.sub(r'[^a-z0-9]+', ' ', str(article.get("bib", {}).get("title", "")).lower()).strip()
+        if title:
+            keys.append(("titulo", title))
+        for field in ("pub_url", "url_scholarbib"):
+            if article.get(field):
+                keys.append((field, article[field]))
+        return keys
+
+    @staticmethod
+    def _article_text(article):
+        bib = article.get("bib") or {}
+        return f"{bib.get('title') or ''} {bib.get('abstract') or ''}"
+
     def _search_articles(self, output_file):
         """
-        Faz a busca de artigos utilizando a biblioteca Scholarly e salva em um arquivo JSON.
+        Faz a busca de artigos utilizando a biblioteca Scholarly, gravando cada resultado no arquivo JSONL
+        assim que ele chega. Cada subconsulta roda em um worker com sua própria sessão, todos atrás do
+        mesmo limitador de taxa, e artigos repetidos entre subconsultas são descartados.
+        Se o arquivo já tiver artigos, cada subconsulta continua a partir do seu último `gsrank`.
         """
-        search_query = scholarly.search_pubs(self.query)
-        all_results = []
+        # Importado sob demanda: o scholarly é lento para carregar e só é usado na busca
+        from scholarly import scholarly, MaxTriesExceededException
+        if not self.sessions:
+            self.sessions = [scholarly]
 
-        try:
-            for i, article in enumerate(search_query):
-                if i >= self.num_results:
-                    break
-                all_results.append(article)
-                print(f"Artigos coletados: {len(all_results)}")
-                time.sleep(self.delay)  # Delay to avoid being blocked by Google Scholar
-        except MaxTriesExceededException as e:
-            print(f"Cannot fetch from Google Scholar: {e}")
-        except Exception as e:
-            print(f"Erro ao buscar artigos: {e}")
+        all_results = self._load_from_file(output_file) if os.path.exists(output_file) else []
+        all_results = all_results or []
+        sub_queries = self.build_sub_queries()
+        sharded = len(sub_queries) > 1
+
+        seen = set()
+        last_ranks = {}
+        for article in all_results:
+            seen.update(self._dedup_keys(article))
+            sub_query = article.get("sub_query", self.query)
+            last_ranks[sub_query] = max(last_ranks.get(sub_query, 0), article.get("gsrank", 0))
+        if all_results:
+            print(f"{len(all_results)} artigos já coletados. Retomando a busca...")
+        # O índice acompanha o arquivo: cada artigo gravado também é indexado
+        index_file = self.index_file(output_file)
+        self.index = InvertedIndex.load_or_build(index_file, [self._article_text(article) for article in all_results])
+
+        lock = threading.Lock()
+        stop = threading.Event()
+        sessions = queue.Queue()
+        for session in self.sessions:
+            sessions.put(session)
+        stats = {"duplicados": 0, "nao_sincronizados": 0}
 
+        needs_newline = self._ends_without_newline(output_file)
+        with open(output_file, "a", encoding="utf-8") as f:
+            # Uma interrupção anterior pode ter deixado uma linha sem quebra no final
+            if needs_newline:
+                f.write("\n")
+
+            def save(article, sub_query):
+                with lock:
+                    if len(all_results) >= self.num_results:
+                        stop.set()
+                        return False
+                    keys = self._dedup_keys(article)
+                    if any(key in seen for key in keys):
+                        stats["duplicados"] += 1
+                        if self.metrics:
+                            self.metrics.increment("coleta.duplicados")
+                        return True
+                    seen.update(keys)
+                    if sharded:
+                        article["sub_query"] = sub_query
+                    f.write(json.dumps(article, ensure_ascii=False) + "\n")
+                    f.flush()
+                    stats["nao_sincronizados"] += 1
+                    if stats["nao_sincronizados"] >= self.fsync_every:
+                        os.fsync(f.fileno())
+                        stats["nao_sincronizados"] = 0
+                    all_results.append(article)
+                    self.index.add_document(self._article_text(article))
+                    if self.metrics:
+                        self.metrics.increment("coleta.artigos")
+                    print(f"Artigos coletados: {len(all_results)}")
+                    return True
+
+            def run_sub_query(sub_query):
+                session = sessions.get()
+                last_rank = last_ranks.get(sub_query, 0)
+                try:
+                    search_query = iter(session.search_pubs(sub_query, start_index=last_rank))
+                    while not stop.is_set():
+                        self.rate_limiter.acquire()
+                        start = time.perf_counter()
+                        article = next(search_query, None)
+                        if self.metrics:
+                            self.metrics.observe("coleta.latencia_s", time.perf_counter() - start)
+                        if article is None:
+                            break
+                        if article.get("gsrank", last_rank + 1) <= last_rank:
+                            continue
+                        if not save(article, sub_query):
+                            break
+                        time.sleep(self.delay)  # Delay to avoid being blocked by Google Scholar
+                    return True
+                except MaxTriesExceededException as e:
+                    print(f"Cannot fetch from Google Scholar: {e}")
+                except Exception as e:
+                    print(f"Erro ao buscar artigos: {e}")
+                finally:
+                    sessions.put(session)
+                return False
+
+            try:
+                if sharded:
+                    print(f"Executando {len(sub_queries)} subconsultas com {len(self.sessions)} sessões em paralelo...")
+                with ThreadPoolExecutor(max_workers=len(self.sessions)) as executor:
+                    finished = all(list(executor.map(run_sub_query, sub_queries)))
+            finally:
+                f.flush()
+                os.fsync(f.fileno())
+                self.index.save(index_file)
+
+        if finished:
+            # A busca terminou (limite atingido ou resultados esgotados): próximas execuções apenas carregam o arquivo
+            open(self._completion_marker(output_file), "w").close()
+        if stats["duplicados"]:
+            print(f"Artigos duplicados descartados entre subconsultas: {stats['duplicados']}")
         if all_results:
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(all_results, f, ensure_ascii=False, indent=4)
             print(f"Total de artigos salvos: {len(all_results)} em {output_file}")
         return all_results
 
     def _process_articles_to_dataframe(self, all_results):
         """
         Processa os resultados do Scholarly e os converte em um DataFrame do pandas.
+        Apenas os campos usados pelo funil são extraídos, direto para listas de colunas;
+        `Fonte` vira categoria e `Data de Publicação` um inteiro pequeno (Int16).
         """
-        articles_list = []
+        titles, links, snippets, authors_list, dates, venues = [], [], [], [], [], []
         for article in all_results:
             try:
-                title = article.get("bib", {}).get("title", "")
+                bib = article.get("bib") or {}
+                authors = bib.get("author", [])
+                title = bib.get("title", "")
                 link = article.get("pub_url", "")
-                snippet = article.get("bib", {}).get("abstract", "")
-                authors = article.get("bib", {}).get("author", [])
-                date = article.get("bib", {}).get("pub_year", "")
-                venue = article.get("bib", {}).get("venue", "")
-
-                articles_list.append({
-                    "Título": title,
-                    "Link": link,
-                    "Snippet": snippet,
-                    "Autores": ", ".join(authors),
-                    "Data de Publicação": date,
-                    "Fonte": venue
-                })
+                snippet = bib.get("abstract", "")
+                authors = ", ".join(authors) if isinstance(authors, list) else str(authors)
+                date = bib.get("pub_year", "")
+                venue = bib.get("venue", "")
             except Exception as e:
                 print(f"Erro ao processar um artigo: {e}")
                 continue
-        return articles_list
+            titles.append(title)
+            links.append(link)
+            snippets.append(snippet)
+            authors_list.append(authors)
+            dates.append(date)
+            venues.append(venue)
+
+        return pd.DataFrame({
+            "Título": titles,
+            "Link": links,
+            "Snippet": snippets,
+            "Autores": authors_list,
+            "Data de Publicação": pd.to_numeric(pd.Series(dates, dtype=object), errors='coerce').astype("Int16"),
+            "Fonte": pd.Categorical(venues),
+        })
 
 # Exemplo de como você iniciaria o processo
 if __name__ == "__main__":
@@ -0,0 +1,309 @@
+import os
+import json
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pandas as pd
+from handdlers.similarity_manager import SimilarityIndex
+from handdlers.index_manager import InvertedIndex
+
+# Colunas devolvidas em cada artigo das respostas, além das pontuações
+RESPONSE_COLUMNS = ['Título', 'Link', 'Autores', 'Data de Publicação', 'Fonte']
+
+
+class RankingService:
+    """
+    Serviço HTTP de longa duração para ordenar e triar o corpus coletado contra vários títulos e resumos.
+    O DataFrame, a matriz de embeddings normalizada e os caches do FunnelManager ficam em memória;
+    os embeddings das consultas que chegam juntas são gerados em um único lote (micro-batching) e
+    os artigos acrescentados ao JSONL pelo SearchManager são incorporados sem reiniciar o serviço.
+
+        POST /rank    {"title": "...", "abstract": "...", "top_k": 20}
+        POST /screen  {"project_title": "...", "top_k": 50}
+        GET  /health
+    """
+
+    def __init__(self, funnel, articles_file=None, host="127.0.0.1", port=8000,
+                 batch_window=0.005, max_batch_size=64, reload_interval=2.0):
+        self.funnel = funnel
+        self.articles_file = articles_file or funnel.articles_file
+        self.host = host
+        self.port = port
+        # Tempo máximo (s) que a primeira consulta de um lote espera por outras antes de gerar os embeddings
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        # Intervalo (s) entre as verificações do arquivo de artigos; None desativa o recarregamento
+        self.reload_interval = reload_interval
+        # (DataFrame, SimilarityIndex) alinhados; substituídos juntos a cada recarga
+        self._state = None
+        # Arquivo efetivamente lido (o JSONL ou o JSON antigo), sua identidade e a posição já lida
+        self._source = None
+        self._offset = 0
+        self._file_id = None
+        self.version = 0
+        # O EmbeddingManager serializa apenas o acesso ao EmbeddingStore: uma recarga que gera embeddings
+        # dos artigos novos não bloqueia os lotes de consultas
+        self._queries = queue.Queue()
+        self._stop = threading.Event()
+        self._threads = []
+        self._server = None
+
+    @property
+    def metrics(self):
+        return self.funnel.metrics
+
+    def load(self):
+        """
+        Lê o arquivo de artigos inteiro e gera (ou carrega do cache) o embedding de cada artigo.
+        Como na coleta, se o JSONL ainda não existir é usado o arquivo JSON antigo com o mesmo nome base.
+        """
+        source = self.funnel.search_manager.resolve_input_file(self.articles_file)
+        if not os.path.exists(source):
+            raise FileNotFoundError(f"Arquivo de artigos não encontrado: {self.articles_file}. Execute a coleta antes.")
+        print(f"Carregando o corpus de {source}...")
+        identity = self._identity(source)
+        df, offset = self.funnel.search_manager.load_articles(source)
+        if df is None or df.empty:
+            raise ValueError(f"Não foi possível carregar os artigos de {source}.")
+        self._state = (df, SimilarityIndex(self._embed_articles(df)))
+        self._source, self._file_id, self._offset = source, identity, offset
+        self.version += 1
+        print(f"Serviço pronto com {len(df)} artigos.")
+
+    def reload(self):
+        """
+        Incorpora os artigos acrescentados ao JSONL desde a última leitura. Se o arquivo foi substituído,
+        encolheu ou o JSONL passou a existir no lugar do JSON antigo, relê tudo. Retorna o número de artigos novos.
+        """
+        source = self.funnel.search_manager.resolve_input_file(self.articles_file)
+        if not os.path.exists(source):
+            return 0
+        if source != self._source or self._identity(source) != self._file_id \
+                or os.path.getsize(source) < self._offset:
+            self.load()
+            return len(self._state[0])
+        if source != self.articles_file:
+            # O JSON antigo não recebe artigos por append
+            return 0
+
+        new_df, end = self.funnel.search_manager.load_articles(source, start=self._offset)
+        self._offset = end
+        if new_df.empty:
+            return 0
+
+        df, index = self._state
+        new_index = index.extended(self._embed_articles(new_df))
+        # Fonte é categórica: concat com categorias diferentes voltaria a object
+        combined = pd.concat([df, new_df], ignore_index=True)
+        combined['Fonte'] = combined['Fonte'].astype('category')
+        self._state = (combined, new_index)
+        self.version += 1
+        if self.metrics:
+            self.metrics.increment("servico.recargas")
+        print(f"{len(new_df)} artigos novos incorporados ao serviço (total: {len(combined)}).")
+        return len(new_df)
+
+    @staticmethod
+    def _identity(path):
+        stat = os.stat(path)
+        return stat.st_dev, stat.st_ino
+
+    def _embed_articles(self, df):
+        return self.funnel.embedding_manager.embed(InvertedIndex.documents(df))
+
+    def embed_queries(self, texts):
+        """
+        Enfileira os textos de uma requisição e espera pelos embeddings, gerados junto com os
+        das demais requisições que chegarem dentro da janela do lote.
+        """
+        future = Future()
+        self._queries.put((list(texts), future))
+        return future.result()
+
+    def _batch_loop(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self._queries.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            deadline = time.perf_counter() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queries.get(timeout=max(0.0, deadline - time.perf_counter())))
+                except queue.Empty:
+                    break
+
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                embeddings = self.funnel.embedding_manager.embed(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            if self.metrics:
+                self.metrics.observe("servico.lote_consultas", len(batch))
+            start = 0
+            for request_texts, future in batch:
+                future.set_result(embeddings[start:start + len(request_texts)])
+                start += len(request_texts)
+
+    def _reload_loop(self):
+        while not self._stop.wait(self.reload_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Erro ao recarregar {self.articles_file}: {e}")
+
+    def rank(self, title, abstract, top_k=20):
+        """
+        Ordena o corpus pela similaridade média com o título e o resumo (FunnelManager.rank_articles).
+        """
+        df, index = self._state
+        queries = self.embed_queries([title, abstract])
+        return self.funnel.rank_articles(df, index, queries, top_k=top_k)
+
+    def screen(self, project_title, top_k=None, accept=None, reject=None):
+        """
+        Nível de embeddings da triagem em cascata contra um título de projeto: retorna os artigos acima
+        do limiar de descarte, marcados como 'aceito' ou 'incerto' (sem chamadas ao LLM).
+        """
+        config = self.funnel.cascade_config
+        accept = config['embedding_accept'] if accept is None else accept
+        reject = config['embedding_reject'] if reject is None else reject
+        df, index = self._state
+        similarities = index.scores(self.embed_queries([project_title]))[0]
+        order = index.top_k_indices(similarities, top_k or len(index))[0]
+        order = order[similarities[order] >= reject]
+        df_screened = df.iloc[order].copy()
+        df_screened['Similaridade Embedding'] = similarities[order]
+        df_screened['Decisão'] = ['aceito' if score >= accept else 'incerto' for score in similarities[order]]
+        return df_screened
+
+    def handle(self, path, body):
+        """
+        Executa uma requisição e retorna (status HTTP, corpo serializável em JSON).
+        """
+        start = time.perf_counter()
+        if path == "/rank":
+            if not body.get("title") and not body.get("abstract"):
+                return 400, {"erro": "Informe 'title' e/ou 'abstract'."}
+            top_k = self._parse_top_k(body.get("top_k", 20))
+            if top_k is None:
+                return 400, {"erro": "'top_k' deve ser um inteiro positivo."}
+            result = self.rank(body.get("title") or "", body.get("abstract") or "", top_k=top_k)
+        elif path == "/screen":
+            if not body.get("project_title"):
+                return 400, {"erro": "Informe 'project_title'."}
+            top_k = None
+            if body.get("top_k") is not None:
+                top_k = self._parse_top_k(body["top_k"])
+                if top_k is None:
+                    return 400, {"erro": "'top_k' deve ser um inteiro positivo."}
+            result = self.screen(body["project_title"], top_k=top_k,
+                                 accept=body.get("accept"), reject=body.get("reject"))
+        else:
+            return 404, {"erro": f"Rota desconhecida: {path}"}
+
+        columns = [column for column in RESPONSE_COLUMNS if column in result.columns]
+        columns += [column for column in result.columns if column not in columns]
+        articles = json.loads(result[columns].to_json(orient="records", force_ascii=False))
+        if self.metrics:
+            self.metrics.observe(f"servico{path.replace('/', '.')}.latencia_s", time.perf_counter() - start)
+        return 200, {"versao": self.version, "artigos": articles}
+
+    @staticmethod
+    def _parse_top_k(value):
+        # Inteiro positivo (número ou texto numérico); None se o valor for inválido
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            return None
+        try:
+            top_k = int(value)
+        except (TypeError, ValueError):
+            return None
+        return top_k if top_k > 0 else None
+
+    def health(self):
+        df, _ = self._state
+        return {"artigos": len(df), "versao": self.version, "arquivo": self._source}
+
+    def _make_handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/health":
+                    self._send(200, service.health())
+                else:
+                    self._send(404, {"erro": f"Rota desconhecida: {self.path}"})
+
+            def do_POST(self):
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                    status, payload = service.handle(self.path, body)
+                except (ValueError, TypeError) as e:
+                    status, payload = 400, {"erro": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"erro": str(e)}
+                self._send(status, payload)
+
+        return Handler
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """
+        Carrega o corpus e inicia o servidor e as threads de lote e de recarga em segundo plano.
+        """
+        if self._state is None:
+            self.load()
+        self._stop.clear()
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        targets = [self._server.serve_forever, self._batch_loop]
+        if self.reload_interval:
+            targets.append(self._reload_loop)
+        self._threads = [threading.Thread(target=target, daemon=True) for target in targets]
+        for thread in self._threads:
+            thread.start()
+        print(f"Serviço de ranking em {self.url}")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join()
+
+    def serve_forever(self):
+        self.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print("Encerrando o serviço...")
+        finally:
+            self.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
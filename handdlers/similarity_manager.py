@@ -0,0 +1,120 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+
+class SimilarityIndex:
+    """
+    Índice de similaridade por cosseno sobre uma matriz float32 contígua e pré-normalizada.
+    Várias consultas são pontuadas com uma única multiplicação de matrizes e o top-k usa argpartition.
+    Para corpora grandes (100k+ artigos) é possível construir um índice aproximado HNSW (hnswlib, opcional).
+    """
+
+    def __init__(self, embeddings, ef_search=200, normalized=False):
+        # Com normalized=True a matriz já tem linhas unitárias e não é copiada de novo
+        self.matrix = np.ascontiguousarray(embeddings, dtype=np.float32) if normalized else self.normalize(embeddings)
+        # Tamanho da lista de candidatos na busca HNSW: maior = mais preciso e mais lento
+        self.ef_search = ef_search
+        self._ann = None
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @staticmethod
+    def normalize(vectors):
+        vectors = np.array(vectors, dtype=np.float32, copy=True, ndmin=2, order='C')
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+    def extended(self, embeddings):
+        """
+        Retorna um novo índice com `embeddings` acrescentados ao final. As linhas existentes não são
+        renormalizadas e o índice atual continua válido para quem ainda o estiver usando.
+        """
+        matrix = np.concatenate([self.matrix, self.normalize(embeddings)]) if len(embeddings) else self.matrix
+        return SimilarityIndex(matrix, ef_search=self.ef_search, normalized=True)
+
+    def scores(self, queries):
+        """
+        Retorna a similaridade de cosseno (n_consultas x n_artigos) de todas as consultas de uma vez.
+        """
+        return self.normalize(queries) @ self.matrix.T
+
+    @staticmethod
+    def top_k_indices(scores, k):
+        """
+        Índices das k maiores pontuações de cada linha, em ordem decrescente, sem ordenar o vetor inteiro.
+        """
+        scores = np.atleast_2d(scores)
+        k = min(k, scores.shape[1])
+        if k == scores.shape[1]:
+            return np.argsort(-scores, axis=1)
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        return np.take_along_axis(candidates, order, axis=1)
+
+    def search(self, queries, k=10, use_ann=False):
+        """
+        Retorna (índices, pontuações) dos k artigos mais similares para cada consulta.
+        """
+        if use_ann:
+            if self._ann is None:
+                raise ValueError("O índice aproximado não foi construído. Chame build_ann() ou load_ann() antes.")
+            self._ann.set_ef(max(k, self.ef_search))
+            labels, distances = self._ann.knn_query(self.normalize(queries), k=min(k, len(self)))
+            # No espaço 'ip' do hnswlib a distância é 1 - produto interno
+            return labels.astype(np.int64), 1.0 - distances
+
+        scores = self.scores(queries)
+        indices = self.top_k_indices(scores, k)
+        return indices, np.take_along_axis(scores, indices, axis=1)
+
+    def fingerprint(self):
+        return hashlib.sha1(self.matrix.tobytes()).hexdigest()
+
+    def build_ann(self, M=16, ef_construction=200, num_threads=-1):
+        """
+        Constrói um índice HNSW (produto interno sobre vetores normalizados) com hnswlib.
+        """
+        try:
+            import hnswlib
+        except ImportError as e:
+            raise ImportError("O índice aproximado requer o pacote hnswlib (pip install hnswlib).") from e
+
+        print(f"Construindo índice HNSW para {len(self)} artigos...")
+        index = hnswlib.Index(space='ip', dim=self.matrix.shape[1])
+        index.init_index(max_elements=len(self), M=M, ef_construction=ef_construction)
+        index.add_items(self.matrix, np.arange(len(self)), num_threads=num_threads)
+        self._ann = index
+        return index
+
+    def save_ann(self, path):
+        self._ann.save_index(path)
+        with open(f"{path}.json", "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint(), "count": len(self)}, f)
+
+    def load_ann(self, path):
+        """
+        Carrega um índice HNSW salvo. Retorna False se ele não existir ou tiver sido construído para outro corpus.
+        """
+        meta_path = f"{path}.json"
+        if not (os.path.exists(path) and os.path.exists(meta_path)):
+            return False
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("count") != len(self) or meta.get("fingerprint") != self.fingerprint():
+            return False
+
+        import hnswlib
+        index = hnswlib.Index(space='ip', dim=self.matrix.shape[1])
+        index.load_index(path, max_elements=len(self))
+        self._ann = index
+        return True
+
+    def load_or_build_ann(self, path, **kwargs):
+        if not self.load_ann(path):
+            self.build_ann(**kwargs)
+            self.save_ann(path)
+        return self._ann
@@ -0,0 +1,73 @@
+import os
+import re
+import json
+import numpy as np
+import pandas as pd
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(__file__), "fontes.json")
+
+
+class SourceNormalizer:
+    """
+    Normaliza nomes de fontes (venues) a partir de regras regex carregadas de um arquivo JSON.
+    As regras são compiladas uma única vez em uma só expressão, avaliada apenas sobre os valores
+    únicos da coluna; o resultado volta para as linhas pelos códigos categóricos.
+    A primeira regra que casar vence; sem correspondência, o resultado é "Outras".
+    """
+
+    def __init__(self, rules_file=None, default="Outras"):
+        self.rules_file = rules_file or DEFAULT_RULES_FILE
+        self.default = default
+        with open(self.rules_file, "r", encoding="utf-8") as f:
+            self.rules = [(rule["padrao"], rule["fonte"]) for rule in json.load(f)]
+
+        # Na alternância, os ramos são tentados em ordem na posição 0: a primeira regra que casa vence,
+        # como no laço original de re.match('.*padrao.*') sobre cada regra
+        branches = [f"(?P<r{i}>.*?(?:{pattern}))" for i, (pattern, _) in enumerate(self.rules)]
+        self._regex = re.compile("|".join(branches), re.IGNORECASE | re.DOTALL)
+        self._names = [name for _, name in self.rules]
+        for pattern, name, winner in self.shadowed_rules():
+            print(f"Aviso: a regra de fonte '{pattern}' ({name}) nunca é aplicada; "
+                  f"uma regra anterior normaliza '{name}' como {winner}. Mova-a para antes em {self.rules_file}.")
+
+    def shadowed_rules(self):
+        """
+        Retorna [(padrão, fonte, fonte vencedora)] das regras encobertas por uma regra anterior mais genérica:
+        o próprio nome normalizado da regra, quando casa com o seu padrão, é capturado por outra regra.
+        """
+        shadowed = []
+        for i, (pattern, name) in enumerate(self.rules):
+            if not re.search(pattern, name, re.IGNORECASE):
+                continue
+            match = self._regex.match(name)
+            winner = int(match.lastgroup[1:])
+            if winner < i:
+                shadowed.append((pattern, name, self._names[winner]))
+        return shadowed
+
+    def normalize(self, fonte):
+        """
+        Normaliza um único nome de fonte.
+        """
+        if not isinstance(fonte, str):
+            return self.default
+        match = self._regex.match(fonte)
+        if match is None:
+            return self.default
+        return self._names[int(match.lastgroup[1:])]
+
+    def normalize_series(self, series):
+        """
+        Normaliza uma coluna inteira avaliando as regras só uma vez por fonte distinta.
+        Retorna uma coluna categórica.
+        """
+        categorical = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype("category")
+        normalized = [self.normalize(value) for value in categorical.cat.categories]
+
+        labels = list(dict.fromkeys(normalized + [self.default]))
+        label_position = {label: i for i, label in enumerate(labels)}
+        # Código extra no final para valores ausentes (código -1 da categoria original)
+        code_map = np.array([label_position[label] for label in normalized] + [label_position[self.default]],
+                            dtype=np.int32)
+        codes = code_map[categorical.cat.codes.to_numpy()]
+        return pd.Series(pd.Categorical.from_codes(codes, categories=labels), index=series.index, name=series.name)
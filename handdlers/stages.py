@@ -0,0 +1,3 @@
+# Etapas do funil com resultado salvo em disco, na ordem de execução.
+# Ficam em um módulo próprio, sem dependências, para que a CLI possa listá-las sem importar o funil.
+FUNNEL_STAGES = ['coleta', 'preprocessamento', 'deduplicacao', 'fontes', 'resumos', 'titulo', 'refinamento']
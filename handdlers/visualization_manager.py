@@ -1,14 +1,89 @@
 import os
 import re
-from sklearn.decomposition import PCA
-from sklearn.cluster import KMeans
-import openai
-import plotly.graph_objects as go
-import plotly.express as px
-from wordcloud import WordCloud, STOPWORDS
+from collections import Counter
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+
+# plotly, wordcloud e scikit-learn são importados dentro dos métodos que os usam,
+# para que importar este módulo (e o FunnelManager) continue rápido
+
+
+def _word_frequencies(text):
+    from wordcloud import WordCloud, STOPWORDS
+
+    # Mesma tokenização de WordCloud.generate (stopwords, plurais e colocações), sem desenhar a nuvem
+    return WordCloud(stopwords=STOPWORDS).process_text(text)
+
+
+def _render_word_cloud(frequencies, output_file):
+    from wordcloud import WordCloud, STOPWORDS
+
+    wordcloud = WordCloud(stopwords=STOPWORDS, background_color="white", width=800, height=400)
+    wordcloud.generate_from_frequencies(frequencies).to_file(output_file)
+
 
 class VisualizationManager:
+    def __init__(self, headless=False, output_formats=None, metrics=None):
+        # No modo headless nenhum gráfico é exibido: as figuras ficam na fila até flush()
+        self.headless = headless
+        # Formatos gravados para cada gráfico: imagens estáticas (png, svg, pdf...), "html" e/ou "json".
+        # Sem formatos, cada gráfico é gravado com a extensão do seu output_file
+        self.output_formats = tuple(output_formats) if output_formats else (None,)
+        self._pending_figures = []
+        # MetricsManager opcional: tempo de exportação dos gráficos e das nuvens de palavras
+        self.metrics = metrics
+
+    def _timer(self, name):
+        return self.metrics.timer(name) if self.metrics else nullcontext()
+
+    def _export(self, fig, output_file):
+        if self.headless:
+            self._pending_figures.append((fig, output_file))
+            return
+        self._write([(fig, output_file)])
+        fig.show()
+
+    def flush(self):
+        """
+        Exporta de uma vez todas as figuras enfileiradas no modo headless.
+        """
+        pending, self._pending_figures = self._pending_figures, []
+        if pending:
+            print(f"Exportando {len(pending)} gráficos...")
+            self._write(pending)
+
+    def _write(self, figures):
+        """
+        Grava as figuras em todos os formatos configurados. Com as versões travadas (plotly 5 e kaleido 0.2),
+        as imagens estáticas são gravadas uma a uma com write_image, e o Kaleido mantém o mesmo processo
+        aberto entre as chamadas; a partir do plotly 6.1 o lote vai de uma vez para plotly.io.write_images.
+        """
+        with self._timer("graficos.exportacao_s"):
+            self._write_formats(figures)
+
+    def _write_formats(self, figures):
+        import plotly.io as pio
+
+        for output_format in self.output_formats:
+            files = [
+                output_file if output_format is None else f"{os.path.splitext(output_file)[0]}.{output_format}"
+                for _, output_file in figures
+            ]
+            if output_format == "html":
+                for (fig, _), file in zip(figures, files):
+                    fig.write_html(file, include_plotlyjs="cdn")
+            elif output_format == "json":
+                for (fig, _), file in zip(figures, files):
+                    fig.write_json(file)
+            elif hasattr(pio, "write_images"):
+                pio.write_images([fig for fig, _ in figures], files)
+            else:
+                for (fig, _), file in zip(figures, files):
+                    fig.write_image(file)
+
     def create_line_chart(self, df, output_file="publicacoes_por_ano_e_fonte.png"):
+        import plotly.graph_objects as go
+
         if 'Fonte Agrupada' not in df.columns:
             raise ValueError("A coluna 'Fonte Agrupada' não foi encontrada no DataFrame.")
 
@@ -38,30 +113,54 @@ class VisualizationManager:
             legend=dict(font=dict(size=16))
         )
 
-        fig.write_image(output_file)
-        fig.show()
-
-    def generate_word_cloud(self, df, column, output_dir="word_clouds", text_type='title_summary'):
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
-        for source in df['Fonte Agrupada'].unique():
-            text = ' '.join(df[df['Fonte Agrupada'] == source][column])
-            wordcloud = WordCloud(stopwords=STOPWORDS, background_color="white", width=800, height=400).generate(text)
-            sanitized_source = re.sub(r'[^\w\s]', '', source).replace(' ', '_')
-            wordcloud.to_file(f"{output_dir}/{text_type}_{sanitized_source}.png")
-
-        general_text = ' '.join(df[column])
-        general_wordcloud = WordCloud(stopwords=STOPWORDS, background_color="white", width=800, height=400).generate(general_text)
-        general_wordcloud.to_file(f"{output_dir}/{text_type}_general.png")
+        self._export(fig, output_file)
+
+    def generate_word_cloud(self, df, column, output_dir="word_clouds", text_type='title_summary', max_workers=None):
+        self.generate_word_clouds(df, [(column, output_dir, text_type)], max_workers=max_workers)
+
+    def generate_word_clouds(self, df, targets, max_workers=None):
+        """
+        Gera as nuvens de palavras por fonte e a geral para cada (coluna, diretório, tipo de texto) em `targets`.
+        O texto de cada fonte é tokenizado uma única vez; a nuvem geral soma as frequências das fontes.
+        Tokenização e renderização rodam em um pool de processos compartilhado por todas as colunas.
+        """
+        jobs = []
+        with self._timer("graficos.nuvens_s"), ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for column, output_dir, text_type in targets:
+                if not os.path.exists(output_dir):
+                    os.makedirs(output_dir)
+
+                grouped = df[column].fillna('').astype(str).groupby(df['Fonte Agrupada'], observed=True, sort=False)
+                sources = list(grouped.groups.keys())
+                texts = [' '.join(group) for _, group in grouped]
+                frequencies = list(executor.map(_word_frequencies, texts))
+
+                general = Counter()
+                for source, source_frequencies in zip(sources, frequencies):
+                    general.update(source_frequencies)
+                    sanitized_source = re.sub(r'[^\w\s]', '', str(source)).replace(' ', '_')
+                    jobs.append((source_frequencies, f"{output_dir}/{text_type}_{sanitized_source}.png"))
+                jobs.append((general, f"{output_dir}/{text_type}_general.png"))
+
+            # Nuvens sem nenhuma palavra (por exemplo, fontes sem snippet) não podem ser desenhadas
+            jobs = [(frequencies, output_file) for frequencies, output_file in jobs if frequencies]
+            if jobs:
+                list(executor.map(_render_word_cloud, *zip(*jobs)))
 
     def create_funnel_chart(self, df, output_file="article_funnel.png"):
-        if 'Stages' not in df.columns or 'Article Count' not in df.columns:
-            raise ValueError("The DataFrame must contain 'Stages' and 'Article Count' columns.")
+        import plotly.express as px
+
+        # O funil do FunnelManager usa 'Etapas' e 'Quantidade de Artigos'; os nomes em inglês continuam aceitos
+        if 'Etapas' in df.columns and 'Quantidade de Artigos' in df.columns:
+            stages, counts = df['Etapas'], df['Quantidade de Artigos']
+        elif 'Stages' in df.columns and 'Article Count' in df.columns:
+            stages, counts = df['Stages'], df['Article Count']
+        else:
+            raise ValueError("The DataFrame must contain 'Etapas' and 'Quantidade de Artigos' (or 'Stages' and 'Article Count') columns.")
 
         fig = px.funnel_area(
-            names=df['Stages'],
-            values=df['Article Count']
+            names=stages,
+            values=counts
         )
 
         fig.update_layout(
@@ -72,10 +171,12 @@ class VisualizationManager:
             legend=dict(font=dict(size=16))
         )
 
-        fig.write_image(output_file)
-        fig.show()
+        self._export(fig, output_file)
+
+    def plot_clusters(self, df, method='OpenAI', output_file="clusters.png", embeddings=None):
+        import plotly.graph_objects as go
+        from sklearn.decomposition import PCA
 
-    def plot_clusters(self, df, method='OpenAI', output_file="clusters.png"):
         cluster_column = f'Cluster {method}'
         if cluster_column not in df.columns:
             raise ValueError(f"The column '{cluster_column}' was not found in the DataFrame.")
@@ -83,7 +184,9 @@ class VisualizationManager:
         pca_columns = [f'PCA_{method}_1', f'PCA_{method}_2']
         if not all(col in df.columns for col in pca_columns):
             pca = PCA(n_components=2)
-            pca_result = pca.fit_transform(df[[col for col in df.columns if col.startswith('embedding_')]])
+            if embeddings is None:
+                embeddings = df[[col for col in df.columns if col.startswith('embedding_')]]
+            pca_result = pca.fit_transform(embeddings)
             df[pca_columns[0]], df[pca_columns[1]] = pca_result[:, 0], pca_result[:, 1]
 
         fig = go.Figure(data=[
@@ -106,5 +209,4 @@ class VisualizationManager:
             legend=dict(font=dict(size=16))
         )
 
-        fig.write_image(output_file)
-        fig.show()
+        self._export(fig, output_file)
@@ -1,44 +1,255 @@
-from handdlers.funnel_manager import FunnelManager
 import os
+import argparse
 from dotenv import load_dotenv
-import pandas as pd
+from handdlers.stages import FUNNEL_STAGES
+
+# Cada subcomando importa apenas os módulos que usa: o funil, o scholarly, o scikit-learn e o plotly
+# são carregados dentro das funções abaixo, e não aqui
 
 load_dotenv()
 
-if __name__ == "__main__":
-    # Query completa e abrangente para busca
-    query = (
-        "(transformer OR transformers OR transformer architecture OR transformer model OR transformer-based OR transformer networks) AND "
-        "(attention mechanism OR self-attention OR multi-head attention OR attention layer OR attention module OR attention-based)"
-    )
+# Query completa e abrangente para busca
+QUERY = (
+    "(transformer OR transformers OR transformer architecture OR transformer model OR transformer-based OR transformer networks) AND "
+    "(attention mechanism OR self-attention OR multi-head attention OR attention layer OR attention module OR attention-based)"
+)
 
-    # Título do projeto para a análise de similaridade
-    project_title = "Alterando o mecanismo de atenção na arquitetura Transformers aplicando funções de (pré-)agregação"
+# Título do projeto para a análise de similaridade
+PROJECT_TITLE = "Alterando o mecanismo de atenção na arquitetura Transformers aplicando funções de (pré-)agregação"
+
+# Título e resumo do texto fornecido
+PROVIDED_TITLE = "Alterando o mecanismo de atenção na arquitetura Transformers aplicando funções de (pré-)agregação"
+PROVIDED_ABSTRACT = """
+    This study proposes an innovative technical approach to enhance Transformers and Vision Transformers (ViTs) models by integrating FG-functional aggregation functions into the self-attention mechanism. The primary objective was to investigate how these functions can improve the models’ ability to capture complex dependencies in high-dimensional data, both in spatial and temporal contexts. Specifically, the research introduces an adapted version of the Choquet integral as a novel formulation for the self-attention mechanism, replacing traditional matrix multiplication with more sophisticated aggregation functions, such as the sum of minima and the maximum of products, aiming for more robust and expressive data analysis.
 
+    Experiments were conducted using high-complexity datasets, including CIFAR-10, CIFAR-100, CALTECH-101, and a dataset for ASL sign language recognition. The results demonstrated that the use of alternative aggregation functions, particularly the adapted version of the Choquet integral, provides performance comparable to the traditional self-attention mechanism, with significant improvements in terms of generalization capacity and robustness in complex classification tasks. This study advances the theoretical understanding of Transformers and opens new avenues for developing more adaptable and efficient AI models. The integration of these advanced aggregation functions represents a substantial advancement in the state of the art, providing a solid foundation for future research in machine learning and artificial intelligence.
+"""
+
+
+def get_openai_api_key():
     # Chave da API da OpenAI
     openai_api_key = os.getenv("OPENAI_API_KEY")
     if not openai_api_key:
         raise ValueError("API key da OpenAI não foi definida. Verifique as variáveis de ambiente.")
+    return openai_api_key
+
+
+def make_funnel(args):
+    from handdlers.funnel_manager import FunnelManager
 
     # Inicializa o funil com a query e a chave da OpenAI
-    funnel = FunnelManager(query, project_title, openai_api_key)
+    return FunnelManager(QUERY, PROJECT_TITLE, get_openai_api_key(),
+                         checkpoint_dir=args.checkpoint_dir, force_from=getattr(args, "force_from", None),
+                         offline=args.offline,
+                         response_cache_options={"max_entries": args.cache_max_entries,
+                                                 "max_age_days": args.cache_max_age_days},
+                         visualization_options={"headless": args.headless, "output_formats": args.chart_formats},
+                         metrics_options={"profile_stage": getattr(args, "profile_stage", None),
+                                          "trace_memory": getattr(args, "trace_memory", False)})
 
-    # Roda o funil completo
-    funnel.run_funnel()
 
-    # Título e resumo do texto fornecido
-    provided_title = "Alterando o mecanismo de atenção na arquitetura Transformers aplicando funções de (pré-)agregação"
-    provided_abstract = """
-    This study proposes an innovative technical approach to enhance Transformers and Vision Transformers (ViTs) models by integrating FG-functional aggregation functions into the self-attention mechanism. The primary objective was to investigate how these functions can improve the models’ ability to capture complex dependencies in high-dimensional data, both in spatial and temporal contexts. Specifically, the research introduces an adapted version of the Choquet integral as a novel formulation for the self-attention mechanism, replacing traditional matrix multiplication with more sophisticated aggregation functions, such as the sum of minima and the maximum of products, aiming for more robust and expressive data analysis.
+def read_articles(path):
+    import pandas as pd
 
-    Experiments were conducted using high-complexity datasets, including CIFAR-10, CIFAR-100, CALTECH-101, and a dataset for ASL sign language recognition. The results demonstrated that the use of alternative aggregation functions, particularly the adapted version of the Choquet integral, provides performance comparable to the traditional self-attention mechanism, with significant improvements in terms of generalization capacity and robustness in complex classification tasks. This study advances the theoretical understanding of Transformers and opens new avenues for developing more adaptable and efficient AI models. The integration of these advanced aggregation functions represents a substantial advancement in the state of the art, providing a solid foundation for future research in machine learning and artificial intelligence.
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    if path.endswith((".json", ".jsonl")):
+        from handdlers.search_manager import SearchManager
+        return SearchManager(QUERY)._load_dataframe(path)
+    return pd.read_csv(path)
+
+
+def load_stage(args, stage):
+    from handdlers.checkpoint_manager import CheckpointManager
+
+    return CheckpointManager(args.checkpoint_dir, stages=FUNNEL_STAGES).load(stage)
+
+
+def collect(args):
     """
+    Coleta (ou retoma a coleta de) artigos do Google Scholar.
+    """
+    from handdlers.search_manager import SearchManager
+
+    df = SearchManager(QUERY, num_results=args.max_articles).collect_articles(args.output)
+    print(f"{len(df)} artigos disponíveis em {args.output}.")
+
 
+def screen(args):
+    """
+    Executa as etapas do funil (pré-processamento, fontes, triagem com GPT-4o Mini, refinamento) e os gráficos.
+    """
+    make_funnel(args).run_funnel()
+
+
+def rank(args):
+    """
+    Ordena os artigos pela similaridade com o título e o resumo fornecidos ou com PDFs.
+    """
+    funnel = make_funnel(args)
     # Realiza a comparação do título e resumo fornecidos com os artigos coletados
-    # Certifique-se de que o método compare_title_and_abstract está implementado na classe FunnelManager
-    df_final = funnel.compare_title_and_abstract(provided_title, provided_abstract, funnel.search_manager.collect_articles())
+    df = read_articles(args.input) if args.input else funnel.search_manager.collect_articles(funnel.articles_file)
+    if args.pdf:
+        # Compara com o texto completo dos PDFs, trecho a trecho, em vez do título e resumo fixos
+        df_final = funnel.compare_with_pdfs(args.pdf, df, top_k=args.top_k, rank_by=args.rank_by)
+    else:
+        df_final = funnel.compare_title_and_abstract(PROVIDED_TITLE, PROVIDED_ABSTRACT, df, top_k=args.top_k)
     if df_final is not None:
-        df_final.to_csv("final.csv", index=False, mode='w')
+        df_final.to_csv(args.output, index=False, mode='w')
         print(df_final.head())
     else:
         print("A comparação não retornou resultados.")
+
+
+def plot(args):
+    """
+    Refaz os gráficos a partir dos resultados salvos, sem executar o funil.
+    """
+    import json
+    import pandas as pd
+    from handdlers.visualization_manager import VisualizationManager
+
+    visualization_manager = VisualizationManager(headless=args.headless, output_formats=args.chart_formats)
+    df = load_stage(args, args.stage)
+    visualization_manager.create_line_chart(df, output_file=f"artigos_{args.stage}_ano.png")
+    visualization_manager.generate_word_clouds(df, [
+        ('Título', "nuvens_palavras_titulo", 'title_summary'),
+        ('Snippet', "nuvens_palavras_resumo", 'title_summary'),
+    ])
+
+    # O gráfico de funil usa as contagens do relatório de métricas da última execução
+    if os.path.exists(args.metrics_report):
+        with open(args.metrics_report, "r", encoding="utf-8") as f:
+            counts = json.load(f).get("artigos_por_etapa", {})
+        funnel_data = pd.DataFrame({'Etapas': list(counts), 'Quantidade de Artigos': list(counts.values())})
+        visualization_manager.create_funnel_chart(funnel_data, output_file="funil_de_artigos.png")
+    visualization_manager.flush()
+
+
+def cluster(args):
+    """
+    Agrupa os artigos de uma etapa salva pelos embeddings e gera o gráfico de clusters.
+    """
+    funnel = make_funnel(args)
+    df_clusters = funnel.cluster_articles(load_stage(args, args.stage), method=args.method, output_file=args.chart)
+    funnel.visualization_manager.flush()
+    df_clusters.to_csv(args.output, index=False, mode='w')
+    print(f"Artigos com clusters salvos em {args.output}.")
+
+
+def run(args):
+    """
+    Fluxo completo: funil e ordenação final dos artigos coletados.
+    """
+    screen(args)
+    args.input, args.top_k = None, None
+    rank(args)
+
+
+def serve(args):
+    """
+    Mantém o corpus, os embeddings e os caches em memória e atende ordenações e triagens por HTTP.
+    """
+    from handdlers.service_manager import RankingService
+
+    funnel = make_funnel(args)
+    RankingService(funnel, articles_file=args.input, host=args.host, port=args.port,
+                   batch_window=args.batch_window, reload_interval=args.reload_interval).serve_forever()
+
+
+def shared_options(suppress=False):
+    """
+    Retorna os parsers das opções compartilhadas (comuns, cache, funil e ordenação). Nas cópias usadas pelos
+    subcomandos (`suppress=True`) as opções não têm padrão, para não sobrescrever o que foi informado antes
+    do subcomando: `main.py --offline rank` e `main.py rank --offline` são equivalentes.
+    """
+    def add(parser, *names, default=None, **kwargs):
+        parser.add_argument(*names, default=argparse.SUPPRESS if suppress else default, **kwargs)
+
+    common = argparse.ArgumentParser(add_help=False)
+    add(common, "--checkpoint-dir", default="checkpoints",
+        help="Diretório onde o resultado de cada etapa é salvo.")
+    add(common, "--headless", default=False, action="store_true",
+        help="Não exibe os gráficos; todos são exportados em lote ao final.")
+    add(common, "--chart-formats", nargs="+",
+        help="Formatos dos gráficos (ex.: png html json). Padrão: a extensão de cada arquivo.")
+
+    funnel_options = argparse.ArgumentParser(add_help=False)
+    add(funnel_options, "--force-from", choices=FUNNEL_STAGES,
+        help="Recalcula a partir desta etapa, ignorando os resultados salvos.")
+    add(funnel_options, "--profile-stage", choices=FUNNEL_STAGES,
+        help="Executa esta etapa sob cProfile; o perfil é salvo no diretório 'perfis'.")
+    add(funnel_options, "--trace-memory", default=False, action="store_true",
+        help="Mede também o pico de memória (tracemalloc) da etapa perfilada.")
+
+    cache_options = argparse.ArgumentParser(add_help=False)
+    add(cache_options, "--offline", default=False, action="store_true",
+        help="Usa apenas respostas e embeddings já armazenados no cache; falha se algum estiver ausente.")
+    add(cache_options, "--cache-max-entries", type=int,
+        help="Número máximo de respostas no cache (remove as menos usadas).")
+    add(cache_options, "--cache-max-age-days", type=float,
+        help="Idade máxima, em dias, das respostas no cache.")
+
+    rank_options = argparse.ArgumentParser(add_help=False)
+    add(rank_options, "--output", default="final.csv", help="Arquivo CSV com os artigos ordenados.")
+    add(rank_options, "--pdf", nargs="+", help="PDFs do próprio trabalho usados na comparação, por seção.")
+    add(rank_options, "--rank-by", choices=["max", "mean"], default="max",
+        help="Com --pdf, ordena pela similaridade máxima ou média entre os trechos.")
+    return common, cache_options, funnel_options, rank_options
+
+
+def build_parser():
+    common, cache_options, funnel_options, rank_options = shared_options()
+    sub_common, sub_cache_options, sub_funnel_options, sub_rank_options = shared_options(suppress=True)
+
+    parser = argparse.ArgumentParser(
+        description="Funil de coleta, triagem e comparação de artigos científicos. Sem subcomando, executa o fluxo completo.",
+        parents=[common, cache_options, funnel_options, rank_options],
+    )
+    parser.set_defaults(func=run)
+    subparsers = parser.add_subparsers(title="subcomandos")
+
+    parser_collect = subparsers.add_parser("collect", parents=[sub_common], help=collect.__doc__.strip())
+    parser_collect.add_argument("--output", default="artigos_google_scholar.jsonl", help="Arquivo JSONL dos artigos.")
+    parser_collect.add_argument("--max-articles", type=int, default=1000, help="Número máximo de artigos.")
+    parser_collect.set_defaults(func=collect)
+
+    parser_screen = subparsers.add_parser("screen", parents=[sub_common, sub_cache_options, sub_funnel_options],
+                                          help=screen.__doc__.strip())
+    parser_screen.set_defaults(func=screen)
+
+    parser_rank = subparsers.add_parser("rank", parents=[sub_common, sub_cache_options, sub_rank_options],
+                                        help=rank.__doc__.strip())
+    parser_rank.add_argument("--input", help="CSV, Parquet ou JSON/JSONL com os artigos (padrão: artigos coletados).")
+    parser_rank.add_argument("--top-k", type=int, help="Mantém apenas os k artigos mais similares.")
+    parser_rank.set_defaults(func=rank)
+
+    parser_plot = subparsers.add_parser("plot", parents=[sub_common], help=plot.__doc__.strip())
+    parser_plot.add_argument("--stage", default="fontes", choices=FUNNEL_STAGES[3:],
+                             help="Etapa salva usada nos gráficos de linha e nas nuvens de palavras.")
+    parser_plot.add_argument("--metrics-report", default="funil_de_artigos_metricas.json",
+                             help="Relatório de métricas com as contagens do gráfico de funil.")
+    parser_plot.set_defaults(func=plot)
+
+    parser_cluster = subparsers.add_parser("cluster", parents=[sub_common, sub_cache_options], help=cluster.__doc__.strip())
+    parser_cluster.add_argument("--stage", default="refinamento", choices=FUNNEL_STAGES, help="Etapa salva a agrupar.")
+    parser_cluster.add_argument("--method", default="OpenAI", help="Nome do método nas colunas e no gráfico.")
+    parser_cluster.add_argument("--output", default="artigos_com_clusters.csv", help="CSV com os clusters.")
+    parser_cluster.add_argument("--chart", default="clusters.png", help="Arquivo do gráfico de clusters.")
+    parser_cluster.set_defaults(func=cluster)
+
+    parser_serve = subparsers.add_parser("serve", parents=[sub_common, sub_cache_options], help=serve.__doc__.strip())
+    parser_serve.add_argument("--input", help="JSONL dos artigos (padrão: artigos coletados).")
+    parser_serve.add_argument("--host", default="127.0.0.1", help="Endereço do servidor HTTP.")
+    parser_serve.add_argument("--port", type=int, default=8000, help="Porta do servidor HTTP.")
+    parser_serve.add_argument("--batch-window", type=float, default=0.005,
+                              help="Espera máxima (s) para agrupar as consultas de requisições simultâneas.")
+    parser_serve.add_argument("--reload-interval", type=float, default=2.0,
+                              help="Intervalo (s) entre as verificações de artigos novos no JSONL (0 desativa).")
+    parser_serve.set_defaults(func=serve)
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    args.func(args)